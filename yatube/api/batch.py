@@ -0,0 +1,167 @@
+from django.db import transaction
+
+from posts import feeds, follows
+from posts.forms import CommentForm, PostForm
+from posts.groups import refresh_stats
+from posts.models import Comment, Follow, Post, User
+
+MAX_BATCH_SIZE = 1000
+# Типы полей, которые пакетные функции используют сами, а не через
+# форму: значение другого типа отклоняется до записи.
+COMMENT_FIELD_TYPES = {'post': int}
+FOLLOW_FIELD_TYPES = {'author': str, 'action': str}
+TYPE_NAMES = {int: 'числом', str: 'строкой'}
+
+
+class BatchError(ValueError):
+    pass
+
+
+def _invalid(errors):
+    return {'status': 'invalid', 'errors': errors}
+
+
+def _created(obj):
+    result = {'status': 'created'}
+    # pk после bulk_create известен не во всех СУБД.
+    if obj.pk is not None:
+        result['id'] = obj.pk
+    return result
+
+
+def check_items(items, field_types=None):
+    """
+    Проверяет форму пакета: список объектов не длиннее MAX_BATCH_SIZE,
+    в которых поля из field_types, если они есть, нужного типа.
+    """
+    if not isinstance(items, list):
+        raise BatchError('Ожидается список items.')
+    if len(items) > MAX_BATCH_SIZE:
+        raise BatchError(f'Не больше {MAX_BATCH_SIZE} элементов за раз.')
+    if not all(isinstance(item, dict) for item in items):
+        raise BatchError('Каждый элемент должен быть объектом.')
+    for index, item in enumerate(items):
+        for field, type_ in (field_types or {}).items():
+            value = item.get(field)
+            # bool в Python тоже int, но id поста из него не получится.
+            if value is not None and (
+                not isinstance(value, type_) or isinstance(value, bool)
+            ):
+                raise BatchError(
+                    f'Элемент {index}: поле {field} должно быть '
+                    f'{TYPE_NAMES[type_]}.'
+                )
+
+
+@transaction.atomic
+def create_posts(user, items):
+    """Проверяет посты правилами PostForm и создаёт их одним запросом."""
+    results = []
+    posts = []
+    for item in items:
+        form = PostForm(data=item)
+        if not form.is_valid():
+            results.append(_invalid(form.errors.get_json_data()))
+            continue
+        post = form.save(commit=False)
+        post.author = user
+        posts.append(post)
+        results.append(post)
+    Post.objects.bulk_create(posts)
+    # bulk_create не посылает сигналов: обновляем счётчики сами.
+    group_ids = {post.group_id for post in posts} - {None}
+    refresh_stats(sorted(group_ids))
+    feeds.invalidate(group_ids=group_ids, author_ids=(user.pk,))
+    return [
+        _created(result) if isinstance(result, Post) else result
+        for result in results
+    ]
+
+
+@transaction.atomic
+def create_comments(user, items):
+    """
+    Проверяет комментарии правилами CommentForm и создаёт их одним
+    запросом. Существование постов проверяется тоже одним запросом.
+    """
+    post_ids = {item.get('post') for item in items}
+    existing = set(
+        Post.objects.filter(
+            pk__in=[pk for pk in post_ids if isinstance(pk, int)]
+        ).values_list('pk', flat=True)
+    )
+    results = []
+    comments = []
+    for item in items:
+        if item.get('post') not in existing:
+            results.append(_invalid({'post': 'Пост не найден.'}))
+            continue
+        form = CommentForm(data=item)
+        if not form.is_valid():
+            results.append(_invalid(form.errors.get_json_data()))
+            continue
+        comment = form.save(commit=False)
+        comment.author = user
+        comment.post_id = item['post']
+        comments.append(comment)
+        results.append(comment)
+    Comment.objects.bulk_create(comments)
+    return [
+        _created(result) if isinstance(result, Comment) else result
+        for result in results
+    ]
+
+
+@transaction.atomic
+def apply_follows(user, items):
+    """
+    Применяет подписки и отписки: пользователи ищутся одним запросом,
+    подписки создаются bulk_create, отписки удаляются одним DELETE.
+    """
+    usernames = {item.get('author') for item in items}
+    authors = {
+        author.username: author
+        for author in User.objects.filter(
+            username__in=[name for name in usernames if isinstance(name, str)]
+        ).only('pk', 'username', 'date_joined')
+    }
+    following = set(
+        Follow.objects.filter(
+            user=user,
+            author_id__in=[author.pk for author in authors.values()],
+        ).values_list('author_id', flat=True)
+    )
+    state = {author_id: True for author_id in following}
+    changed = {}
+    results = []
+    for item in items:
+        author = authors.get(item.get('author'))
+        action = item.get('action', 'follow')
+        if author is None:
+            results.append(_invalid({'author': 'Пользователь не найден.'}))
+        elif action not in ('follow', 'unfollow'):
+            results.append(_invalid({'action': 'Неизвестное действие.'}))
+        elif author.pk == user.pk:
+            results.append(_invalid({'author': 'Нельзя подписаться на себя.'}))
+        else:
+            wanted = action == 'follow'
+            if state.get(author.pk, False) == wanted:
+                results.append({'status': 'unchanged'})
+            else:
+                changed[author.pk] = author
+                state[author.pk] = wanted
+                results.append({'status': action + 'ed'})
+    to_follow = [
+        Follow(user=user, author_id=author_id)
+        for author_id, wanted in state.items()
+        if wanted and author_id not in following
+    ]
+    to_unfollow = [
+        author_id for author_id, wanted in state.items()
+        if not wanted and author_id in following
+    ]
+    if to_unfollow:
+        Follow.objects.filter(user=user, author_id__in=to_unfollow).delete()
+    Follow.objects.bulk_create(to_follow, ignore_conflicts=True)
+    follows.invalidate(user, changed.values())
+    return results
@@ -0,0 +1,94 @@
+from django.conf import settings
+
+from core.pagination import InvalidCursor, after_cursor, encode_cursor
+
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+}
+
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+}
+
+
+class SerializerError(ValueError):
+    pass
+
+
+def _media_url(name):
+    return settings.MEDIA_URL + name if name else None
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+FORMATTERS = {
+    'image': _media_url,
+    'pub_date': _isoformat,
+}
+
+
+def parse_fields(raw, available):
+    """
+    Разбирает параметр ?fields=a,b. Без параметра возвращает все поля.
+    """
+    if not raw:
+        return list(available)
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = set(fields) - set(available)
+    if unknown:
+        raise SerializerError(
+            'Неизвестные поля: ' + ', '.join(sorted(unknown))
+        )
+    return fields
+
+
+def _serialize_rows(rows, fields, available):
+    formatters = [
+        (field, available[field], FORMATTERS.get(field)) for field in fields
+    ]
+    result = []
+    for row in rows:
+        item = {}
+        for field, lookup, formatter in formatters:
+            value = row[lookup]
+            item[field] = formatter(value) if formatter else value
+        result.append(item)
+    return result
+
+
+def serialize_values(queryset, fields, available):
+    """
+    Сериализует queryset через .values(), не создавая объекты моделей.
+    """
+    lookups = {available[field] for field in fields}
+    return _serialize_rows(queryset.values(*lookups), fields, available)
+
+
+def serialize_page(queryset, fields, available, cursor, limit):
+    """
+    Сериализует страницу ленты после курсора одним запросом и
+    возвращает её вместе с курсором следующей страницы. Лента
+    упорядочена по (-pub_date, -pk), поэтому страница выбирается по
+    индексу, без OFFSET и COUNT(*).
+    """
+    try:
+        queryset = after_cursor(queryset, cursor)
+    except InvalidCursor as error:
+        raise SerializerError(str(error))
+    lookups = {available[field] for field in fields} | {'pub_date', 'pk'}
+    rows = list(queryset.values(*lookups)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['pub_date'], rows[-1]['pk'])
+    return _serialize_rows(rows, fields, available), next_cursor
@@ -0,0 +1,260 @@
+import json
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiViewsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group,
+                text=f'Тестовый пост {i}',
+            )
+            for i in range(15)
+        ]
+        cls.posts[0].comments.create(
+            author=cls.author, text='Тестовый комментарий'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.user = User.objects.create_user(username='HasNoName')
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+
+    def test_feeds_return_json(self):
+        """
+        Ленты отдают JSON со списком постов.
+        """
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_posts', kwargs={'slug': self.group.slug}),
+            reverse(
+                'api:profile_posts',
+                kwargs={'username': self.author.username},
+            ),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                data = response.json()
+                self.assertEqual(len(data['results']), 10)
+                self.assertEqual(data['results'][0]['author'], 'author')
+
+    def test_cursor_pagination(self):
+        """
+        Курсор возвращает следующую страницу без повторов.
+        """
+        first = self.guest_client.get(reverse('api:index')).json()
+        second = self.guest_client.get(
+            reverse('api:index'), {'cursor': first['next']}
+        ).json()
+        self.assertIsNone(second['next'])
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertEqual(len(ids), len(self.posts))
+        self.assertEqual(len(set(ids)), len(self.posts))
+
+    def test_field_selection(self):
+        """
+        Параметр fields ограничивает набор полей.
+        """
+        response = self.guest_client.get(
+            reverse('api:index'), {'fields': 'id,text'}
+        )
+        self.assertEqual(
+            set(response.json()['results'][0]), {'id', 'text'}
+        )
+        response = self.guest_client.get(
+            reverse('api:index'), {'fields': 'password'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_post_detail_and_profile(self):
+        """
+        Пост отдаётся с комментариями, профиль со счётчиками.
+        """
+        post = self.posts[0]
+        data = self.guest_client.get(
+            reverse('api:post_detail', kwargs={'post_id': post.pk})
+        ).json()
+        self.assertEqual(data['text'], post.text)
+        self.assertEqual(data['group'], self.group.slug)
+        self.assertEqual(len(data['comments']), 1)
+        Follow.objects.create(user=self.user, author=self.author)
+        data = self.user_client.get(
+            reverse('api:profile', kwargs={'username': self.author.username})
+        ).json()
+        self.assertEqual(data['posts_count'], len(self.posts))
+        self.assertEqual(data['follower_count'], 1)
+        self.assertTrue(data['following'])
+
+    def test_follow_feed_requires_authentication(self):
+        """
+        Лента подписок доступна только авторизованному пользователю.
+        """
+        response = self.guest_client.get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.user_client.get(reverse('api:follow_index'))
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_missing_objects_return_json_404(self):
+        """
+        Несуществующие объекты возвращают JSON с ошибкой 404.
+        """
+        urls = (
+            reverse('api:post_detail', kwargs={'post_id': 0}),
+            reverse('api:group_posts', kwargs={'slug': 'missing'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertIn('detail', response.json())
+
+
+class BatchApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.authors = [
+            User.objects.create_user(username=f'author_{i}')
+            for i in range(3)
+        ]
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            author=cls.authors[0], text='Тестовый пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+
+    def post_batch(self, name, items, client=None):
+        return (client or self.user_client).post(
+            reverse(f'api:{name}'),
+            data=json.dumps({'items': items}),
+            content_type='application/json',
+        )
+
+    def test_batch_requires_authentication(self):
+        """
+        Пакетная запись недоступна неавторизованному пользователю.
+        """
+        response = self.post_batch('batch_posts', [], self.guest_client)
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_batch_posts(self):
+        """
+        Посты проверяются правилами PostForm и создаются пакетом.
+        """
+        response = self.post_batch('batch_posts', [
+            {'text': 'Первый', 'group': self.group.pk},
+            {'text': ''},
+            {'text': 'Второй'},
+        ])
+        statuses = [item['status'] for item in response.json()['results']]
+        self.assertEqual(statuses, ['created', 'invalid', 'created'])
+        self.assertEqual(self.user.posts.count(), 2)
+        self.assertTrue(
+            self.user.posts.filter(text='Первый', group=self.group).exists()
+        )
+
+    def test_batch_comments(self):
+        """
+        Комментарии к несуществующим постам не создаются.
+        """
+        response = self.post_batch('batch_comments', [
+            {'post': self.post.pk, 'text': 'Комментарий'},
+            {'post': 0, 'text': 'Комментарий'},
+        ])
+        statuses = [item['status'] for item in response.json()['results']]
+        self.assertEqual(statuses, ['created', 'invalid'])
+        self.assertEqual(self.post.comments.count(), 1)
+
+    def test_batch_follows(self):
+        """
+        Подписки и отписки применяются пакетом без дублей.
+        """
+        Follow.objects.create(user=self.user, author=self.authors[2])
+        with self.assertNumQueries(7):
+            response = self.post_batch('batch_follows', [
+                {'author': 'author_0'},
+                {'author': 'author_0'},
+                {'author': 'author_1', 'action': 'follow'},
+                {'author': 'author_2', 'action': 'unfollow'},
+                {'author': 'HasNoName'},
+                {'author': 'missing'},
+            ])
+        statuses = [item['status'] for item in response.json()['results']]
+        self.assertEqual(statuses, [
+            'followed', 'unchanged', 'followed', 'unfollowed',
+            'invalid', 'invalid',
+        ])
+        self.assertEqual(
+            set(
+                Follow.objects.filter(user=self.user)
+                .values_list('author__username', flat=True)
+            ),
+            {'author_0', 'author_1'},
+        )
+
+    def test_batch_rejects_non_scalar_fields(self):
+        """
+        Поле другого типа, например список, отклоняется ответом 400, и
+        ничего не записывается.
+        """
+        for name, items in (
+            ('batch_comments', [{'post': [self.post.pk], 'text': 'Текст'}]),
+            ('batch_comments', [{'post': True, 'text': 'Текст'}]),
+            ('batch_follows', [{'author': ['author_0']}]),
+            ('batch_follows', [{'author': 'author_0', 'action': {}}]),
+        ):
+            with self.subTest(name=name, items=items):
+                response = self.post_batch(name, items)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.BAD_REQUEST
+                )
+                self.assertIn('detail', response.json())
+        self.assertFalse(self.post.comments.exists())
+        self.assertFalse(Follow.objects.filter(user=self.user).exists())
+
+    @override_settings(RATE_LIMITS={'add_comment': '3/m'})
+    def test_batch_items_count_against_rate_limit(self):
+        """
+        Каждый элемент пакета расходует лимит, как отдельный запрос:
+        сверх лимита пакет отклоняется ответом 429 целиком.
+        """
+        item = {'post': self.post.pk, 'text': 'Комментарий'}
+        response = self.post_batch('batch_comments', [item] * 2)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = self.post_batch('batch_comments', [item] * 2)
+        self.assertEqual(
+            response.status_code, HTTPStatus.TOO_MANY_REQUESTS
+        )
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertIn('detail', response.json())
+        self.assertEqual(self.post.comments.count(), 2)
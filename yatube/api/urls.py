@@ -0,0 +1,25 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('v1/posts/', views.index, name='index'),
+    path('v1/posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'v1/groups/<slug:slug>/posts/',
+        views.group_posts,
+        name='group_posts',
+    ),
+    path('v1/profiles/<str:username>/', views.profile, name='profile'),
+    path(
+        'v1/profiles/<str:username>/posts/',
+        views.profile_posts,
+        name='profile_posts',
+    ),
+    path('v1/follow/posts/', views.follow_index, name='follow_index'),
+    path('v1/batch/posts/', views.batch_posts, name='batch_posts'),
+    path('v1/batch/comments/', views.batch_comments, name='batch_comments'),
+    path('v1/batch/follows/', views.batch_follows, name='batch_follows'),
+]
@@ -0,0 +1,165 @@
+import json
+import math
+from functools import wraps
+from http import HTTPStatus
+
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET, require_POST
+
+from core import ratelimit
+from posts import follows
+from posts.models import Comment, Group, Post, User
+
+from . import batch
+from .serializers import (
+    COMMENT_FIELDS, POST_FIELDS, SerializerError, parse_fields,
+    serialize_page, serialize_values
+)
+
+PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+
+def error_response(detail, status):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def api_view(view):
+    """
+    Только GET; ошибки разбора параметров превращаются в ответ 400,
+    а Http404 в JSON-ответ 404.
+    """
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except SerializerError as error:
+            return error_response(str(error), HTTPStatus.BAD_REQUEST)
+        except Http404:
+            return error_response('Не найдено.', HTTPStatus.NOT_FOUND)
+    return wrapper
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        raise SerializerError('limit должен быть числом.')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def feed_response(request, posts, **extra):
+    fields = parse_fields(request.GET.get('fields'), POST_FIELDS)
+    results, next_cursor = serialize_page(
+        posts,
+        fields,
+        POST_FIELDS,
+        request.GET.get('cursor'),
+        get_limit(request),
+    )
+    return JsonResponse({**extra, 'next': next_cursor, 'results': results})
+
+
+@api_view
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(
+        request,
+        Post.objects.filter(group=group),
+        group={
+            'slug': group.slug,
+            'title': group.title,
+            'description': group.description,
+        },
+    )
+
+
+@api_view
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return JsonResponse({
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'posts_count': author.posts.count(),
+        'follower_count': follows.follower_count(author),
+        'following': follows.is_following(request.user, author),
+    })
+
+
+@api_view
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, Post.objects.filter(author=author))
+
+
+@api_view
+def post_detail(request, post_id):
+    fields = parse_fields(request.GET.get('fields'), POST_FIELDS)
+    posts = serialize_values(
+        Post.objects.filter(pk=post_id), fields, POST_FIELDS
+    )
+    if not posts:
+        raise Http404
+    comments = serialize_values(
+        Comment.objects.filter(post_id=post_id).order_by('pub_date', 'pk'),
+        list(COMMENT_FIELDS),
+        COMMENT_FIELDS,
+    )
+    return JsonResponse({**posts[0], 'comments': comments})
+
+
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error_response(
+            'Требуется авторизация.', HTTPStatus.UNAUTHORIZED
+        )
+    return feed_response(
+        request,
+        Post.objects.filter(**follows.followed_posts_filter(request.user)),
+    )
+
+
+def batch_view(apply, scope, field_types=None):
+    """
+    Пакетная запись: принимает {"items": [...]} от авторизованного
+    пользователя и возвращает результат для каждого элемента. Типы
+    полей field_types проверяются до записи. Каждый элемент расходует
+    жетон ограничения частоты scope, как отдельный запрос к странице.
+    """
+    @require_POST
+    def view(request):
+        if not request.user.is_authenticated:
+            return error_response(
+                'Требуется авторизация.', HTTPStatus.UNAUTHORIZED
+            )
+        try:
+            items = json.loads(request.body)['items']
+            batch.check_items(items, field_types)
+        except (ValueError, KeyError, TypeError) as error:
+            return error_response(str(error), HTTPStatus.BAD_REQUEST)
+        retry_after = ratelimit.check(request, scope, len(items))
+        if retry_after:
+            response = error_response(
+                'Слишком много запросов.', HTTPStatus.TOO_MANY_REQUESTS
+            )
+            response['Retry-After'] = str(math.ceil(retry_after))
+            return response
+        return JsonResponse({'results': apply(request.user, items)})
+    return view
+
+
+batch_posts = batch_view(batch.create_posts, 'post_create')
+batch_comments = batch_view(
+    batch.create_comments, 'add_comment', batch.COMMENT_FIELD_TYPES
+)
+batch_follows = batch_view(
+    batch.apply_follows, 'profile_follow', batch.FOLLOW_FIELD_TYPES
+)
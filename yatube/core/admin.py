@@ -0,0 +1,35 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'status', 'attempts', 'run_at', 'created')
+    list_filter = ('status', 'name')
+    readonly_fields = (
+        'name',
+        'params',
+        'status',
+        'attempts',
+        'max_attempts',
+        'run_at',
+        'locked_at',
+        'error',
+        'created',
+    )
+    fields = readonly_fields
+    actions = ('retry',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def retry(self, request, queryset):
+        updated = queryset.filter(status=Task.FAILED).update(
+            status=Task.PENDING, attempts=0, run_at=timezone.now()
+        )
+        self.message_user(request, f'Поставлено на повтор задач: {updated}')
+    retry.short_description = 'Повторить выбранные задачи'
+
+
+admin.site.register(Task, TaskAdmin)
@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.db import router
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject
+
+User = auth.get_user_model()
+
+USER_KEY = 'auth:user:{}:{}'
+# Поля, которые нужны шаблонам и проверкам доступа. Хеш пароля в кеш
+# не попадает: при обращении к нему пользователь догрузит его из БД.
+SNAPSHOT_FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'email', 'is_active',
+    'is_staff', 'is_superuser', 'last_login', 'date_joined',
+)
+
+
+def _cache():
+    return caches[getattr(settings, 'AUTH_USER_CACHE_ALIAS', 'default')]
+
+
+def _snapshot(user):
+    # Порядок полей как в модели: его ожидает User.from_db.
+    return {
+        field.attname: getattr(user, field.attname)
+        for field in User._meta.concrete_fields
+        if field.attname in SNAPSHOT_FIELDS
+    }
+
+
+def get_user(request):
+    """
+    auth.get_user с кешем. Снимок полей пользователя хранится под
+    ключом из id и хеша пароля в сессии, поэтому после смены пароля
+    старый снимок уже не находится, а проверка сессии идёт через базу.
+    Поля вне SNAPSHOT_FIELDS у пользователя из кеша отложены.
+    """
+    session = request.session
+    try:
+        user_id = User._meta.pk.to_python(session[auth.SESSION_KEY])
+        backend_path = session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    session_hash = session.get(auth.HASH_SESSION_KEY)
+    backends = settings.AUTHENTICATION_BACKENDS
+    if not session_hash or backend_path not in backends:
+        return auth.get_user(request)
+    key = USER_KEY.format(user_id, session_hash)
+    values = _cache().get(key)
+    if values is not None:
+        user = User.from_db(
+            router.db_for_read(User), list(values), list(values.values())
+        )
+        user.backend = backend_path
+        return user
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        _cache().set(
+            key,
+            _snapshot(user),
+            getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 5 * 60),
+        )
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware, которая берёт пользователя из кеша."""
+
+    def process_request(self, request):
+        def load():
+            if not hasattr(request, '_cached_user'):
+                request._cached_user = get_user(request)
+            return request._cached_user
+
+        request.user = SimpleLazyObject(load)
+
+
+def invalidate(user, *passwords):
+    """Удаляет снимки пользователя для хешей перечисленных паролей."""
+    hashes = {
+        User(password=password).get_session_auth_hash()
+        for password in passwords
+    }
+    _cache().delete_many([USER_KEY.format(user.pk, value) for value in hashes])
+
+
+def _stored_password(instance):
+    return User.objects.filter(pk=instance.pk).values_list(
+        'password', flat=True
+    ).first()
+
+
+@receiver(pre_save, sender=User)
+def remember_password(sender, instance, raw, **kwargs):
+    """Запоминает пароль из БД: по нему удаляется старый снимок."""
+    if raw or instance.pk is None:
+        instance._stored_password = None
+    else:
+        instance._stored_password = _stored_password(instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_saved_user(sender, instance, created, **kwargs):
+    if not created:
+        # Отложенный пароль не догружаем: он не менялся.
+        passwords = {
+            instance._stored_password, instance.__dict__.get('password')
+        }
+        invalidate(instance, *passwords - {None})
+
+
+@receiver(pre_delete, sender=User)
+def remember_deleted_password(sender, instance, **kwargs):
+    instance._stored_password = _stored_password(instance)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user(sender, instance, **kwargs):
+    if instance._stored_password is not None:
+        invalidate(instance, instance._stored_password)
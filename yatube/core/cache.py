@@ -0,0 +1,84 @@
+import os
+import pickle
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+from django.core.files.move import file_move_safe
+
+LOCK_NAME = 'counters.lock'
+
+
+class SharedFileCache(FileBasedCache):
+    """
+    Файловый кеш, общий для процессов сервера на одной машине.
+
+    FileBasedCache при каждой записи перечисляет весь каталог, чтобы
+    решить, пора ли вытеснять записи, и при MAX_ENTRIES в десятки
+    тысяч запись становится линейной. Здесь каталог проверяется не
+    чаще раза в CULL_INTERVAL секунд (из OPTIONS). Кроме того, add и
+    incr выполняются под блокировкой файла и атомарны между
+    процессами, так что в кеше можно держать счётчики.
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        options = params.get('OPTIONS', {})
+        self._cull_interval = int(options.get('CULL_INTERVAL', 60))
+        self._culled = None
+
+    def _cull(self):
+        now = time.monotonic()
+        if (
+            self._culled is not None
+            and now - self._culled < self._cull_interval
+        ):
+            return
+        self._culled = now
+        super()._cull()
+
+    @contextmanager
+    def _locked(self):
+        self._createdir()
+        with open(os.path.join(self._dir, LOCK_NAME), 'ab') as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked():
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарный incr, который не продлевает срок записи."""
+        fname = self._key_to_file(key, version)
+        with self._locked():
+            try:
+                with open(fname, 'rb') as f:
+                    expiry = pickle.load(f)
+                    value = pickle.loads(zlib.decompress(f.read()))
+            except (FileNotFoundError, EOFError):
+                expiry = value = None
+            if value is None or expiry is not None and expiry < time.time():
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+            renamed = False
+            try:
+                with open(fd, 'wb') as f:
+                    f.write(pickle.dumps(expiry, self.pickle_protocol))
+                    f.write(zlib.compress(
+                        pickle.dumps(value, self.pickle_protocol)
+                    ))
+                file_move_safe(tmp_path, fname, allow_overwrite=True)
+                renamed = True
+            finally:
+                if not renamed:
+                    os.remove(tmp_path)
+        return value
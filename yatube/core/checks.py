@@ -0,0 +1,44 @@
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.checks import Error, Tags, register
+
+STATIC_TAG = re.compile(r"""{%\s*static\s+['"]([^'"]+)['"]\s*%}""")
+HARDCODED_STATIC = re.compile(r"""(?:['"(]/static/|{{\s*STATIC_URL)""")
+
+
+def template_files():
+    for engine in settings.TEMPLATES:
+        for directory in engine.get('DIRS', []):
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    if filename.endswith('.html'):
+                        yield os.path.join(root, filename)
+
+
+@register(Tags.templates)
+def check_static_references(app_configs, **kwargs):
+    """
+    Шаблоны должны ссылаться на статику только через {% static %},
+    иначе в ссылку не попадёт имя с хешем из манифеста.
+    """
+    errors = []
+    for path in template_files():
+        with open(path, encoding='utf-8') as template:
+            content = template.read()
+        if HARDCODED_STATIC.search(content):
+            errors.append(Error(
+                'Шаблон ссылается на статику без тега {% static %}.',
+                obj=path,
+                id='core.E001',
+            ))
+        for name in STATIC_TAG.findall(content):
+            if not finders.find(name):
+                errors.append(Error(
+                    f'Статический файл {name} не найден.',
+                    obj=path,
+                    id='core.E002',
+                ))
+    return errors
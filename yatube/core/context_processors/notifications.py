@@ -0,0 +1,16 @@
+from django.utils.functional import SimpleLazyObject
+
+from posts.notifications import unread_count
+
+
+def unread_notifications(request):
+    """
+    Число непрочитанных уведомлений для шапки. Считается, только если
+    шаблон его выводит, и берётся из кеша.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {
+        'unread_notifications': SimpleLazyObject(lambda: unread_count(user))
+    }
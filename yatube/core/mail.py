@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .tasks import task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+_local = threading.local()
+
+
+def _delivery_backend():
+    return getattr(
+        settings, 'EMAIL_DELIVERY_BACKEND', DEFAULT_DELIVERY_BACKEND
+    )
+
+
+def _payload(message):
+    return {
+        'subject': str(message.subject),
+        'body': str(message.body),
+        'from_email': message.from_email,
+        'to': list(message.to),
+        'cc': list(message.cc),
+        'bcc': list(message.bcc),
+        'reply_to': list(message.reply_to),
+        'headers': message.extra_headers,
+        'alternatives': list(getattr(message, 'alternatives', [])),
+    }
+
+
+def _message(payload):
+    payload = dict(payload)
+    alternatives = [tuple(item) for item in payload.pop('alternatives')]
+    return EmailMultiAlternatives(alternatives=alternatives, **payload)
+
+
+def _close():
+    connection = getattr(_local, 'connection', None)
+    _local.connection = None
+    if connection is not None:
+        try:
+            connection.close()
+        except Exception:
+            logger.warning('Не удалось закрыть соединение с почтой')
+
+
+def _connection():
+    """
+    Соединение с настоящим почтовым бэкендом, общее для задач одного
+    потока исполнителя. Простоявшее дольше EMAIL_CONNECTION_IDLE секунд
+    соединение открывается заново.
+    """
+    backend = _delivery_backend()
+    idle = getattr(settings, 'EMAIL_CONNECTION_IDLE', 30)
+    if getattr(_local, 'connection', None) is not None and (
+        _local.backend != backend or time.monotonic() - _local.used > idle
+    ):
+        _close()
+    if getattr(_local, 'connection', None) is None:
+        connection = get_connection(backend, fail_silently=False)
+        connection.open()
+        _local.connection = connection
+        _local.backend = backend
+    _local.used = time.monotonic()
+    return _local.connection
+
+
+@task(max_attempts=5)
+def deliver(payloads):
+    """
+    Отправляет порцию писем через одно соединение. Если письмо не
+    ушло, уже отправленные не повторяются: остаток ставится отдельной
+    задачей, а ошибка на первом письме уходит в повтор с паузой.
+    """
+    for index, payload in enumerate(payloads):
+        try:
+            _connection().send_messages([_message(payload)])
+        except Exception:
+            _close()
+            if index == 0:
+                raise
+            logger.exception('Письмо не отправлено, остаток в очередь')
+            deliver.delay(payloads[index:])
+            return
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """
+    Почтовый бэкенд, который не отправляет письма сам, а ставит их в
+    очередь core.tasks порциями по EMAIL_BATCH_SIZE. Доставляет их
+    исполнитель через EMAIL_DELIVERY_BACKEND. Письма с вложениями
+    отправляются сразу: вложения в очередь не сериализуются.
+    """
+
+    def send_messages(self, email_messages):
+        queued = [message for message in email_messages
+                  if not message.attachments]
+        direct = [message for message in email_messages
+                  if message.attachments]
+        if direct:
+            get_connection(
+                _delivery_backend(), fail_silently=self.fail_silently
+            ).send_messages(direct)
+        batch_size = getattr(settings, 'EMAIL_BATCH_SIZE', 50)
+        for start in range(0, len(queued), batch_size):
+            deliver.delay([
+                _payload(message)
+                for message in queued[start:start + batch_size]
+            ])
+        return len(email_messages)
@@ -0,0 +1,87 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+User = get_user_model()
+
+ENGINES = {
+    name: f'django.contrib.sessions.backends.{name}'
+    for name in ('db', 'cache', 'cached_db', 'signed_cookies')
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет скорость ленты для авторизованного пользователя с '
+        'разными хранилищами сессий. Созданные записи откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Сколько запросов выполнить с каждым хранилищем.',
+        )
+        parser.add_argument(
+            '--engines',
+            nargs='+',
+            choices=list(ENGINES),
+            default=list(ENGINES),
+        )
+        parser.add_argument('--path', default='')
+        parser.add_argument(
+            '--host',
+            default=next(
+                (host for host in settings.ALLOWED_HOSTS if '*' not in host),
+                'localhost',
+            ),
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        path = options['path'] or reverse('posts:index')
+        user = User.objects.create_user(username='session-benchmark')
+        for name in options['engines']:
+            with override_settings(SESSION_ENGINE=ENGINES[name]):
+                self.measure(name, user, path, options)
+
+    def measure(self, name, user, path, options):
+        # Адрес не из INTERNAL_IPS, чтобы не включалась панель отладки.
+        client = Client(HTTP_HOST=options['host'], REMOTE_ADDR='10.0.0.1')
+        client.force_login(user)
+        client.get(path)
+        # Заполненный журнал запросов CaptureQueriesContext не считает.
+        reset_queries()
+        with CaptureQueriesContext(connection) as context:
+            client.get(path)
+        session_queries = sum(
+            1 for query in context.captured_queries
+            if 'django_session' in query['sql']
+        )
+        started = time.monotonic()
+        for _ in range(options['requests']):
+            client.get(path)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{name}: {options["requests"] / elapsed:.0f} запросов/с, '
+            f'SQL на запрос: {len(context)}, '
+            f'из них к сессиям: {session_queries}'
+        )
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.sessions import CHUNK_SIZE, clear_expired
+
+
+class Command(BaseCommand):
+    help = 'Удаляет истёкшие сессии из базы небольшими порциями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Сколько сессий удалять одним запросом.',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.1,
+            help='Пауза в секундах между порциями.',
+        )
+        parser.add_argument(
+            '--every',
+            type=float,
+            default=0,
+            help='Повторять очистку каждые N секунд.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            total = clear_expired(options['chunk_size'], options['pause'])
+            self.stdout.write(f'Удалено сессий: {total}')
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,81 @@
+import multiprocessing
+import queue
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from core.tasks import work
+
+
+def _work(once, poll, results):
+    done = 0
+    try:
+        done = work(once=once, poll=poll)
+    finally:
+        results.put(done)
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Исполнитель фоновых задач core.tasks: выполняет задачи из '
+        'очереди в нескольких потоках или процессах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'TASKS_WORKERS', 1),
+            help='Число исполнителей; при 1 задачи выполняются в '
+                 'основном потоке.',
+        )
+        parser.add_argument(
+            '--processes',
+            action='store_true',
+            help='Запускать исполнителей в отдельных процессах, а не '
+                 'в потоках.',
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=1,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        args = (options['once'], options['poll'])
+        if options['workers'] < 2:
+            done = work(*args)
+            self.stdout.write(f'Выполнено задач: {done}')
+            return
+        if options['processes']:
+            # Дочерние процессы не должны наследовать соединения с базой.
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            results = context.Queue()
+            workers = [
+                context.Process(target=_work, args=args + (results,))
+                for _ in range(options['workers'])
+            ]
+        else:
+            results = queue.Queue()
+            workers = [
+                threading.Thread(
+                    target=_work, args=args + (results,), daemon=True
+                )
+                for _ in range(options['workers'])
+            ]
+        for worker in workers:
+            worker.start()
+        done = sum(results.get() for _ in workers)
+        for worker in workers:
+            worker.join()
+        self.stdout.write(f'Выполнено задач: {done}')
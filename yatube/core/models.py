@@ -11,3 +11,39 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Task(models.Model):
+    """Отложенный вызов функции, см. core.tasks."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Функция', max_length=200)
+    params = models.TextField('Аргументы', default='{}')
+    status = models.CharField(
+        'Состояние',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Наибольшее число попыток')
+    run_at = models.DateTimeField('Выполнить после')
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    error = models.TextField('Ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+
+    class Meta:
+        ordering = ['run_at']
+        indexes = [models.Index(fields=['status', 'run_at'])]
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,182 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+COUNT_KEY = 'paginator:count:{}'
+
+# Оценки числа строк из статистики планировщика.
+ESTIMATE_QUERIES = {
+    'postgresql': 'SELECT reltuples FROM pg_class WHERE relname = %s',
+    'sqlite': 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(pub_date, pk):
+    raw = f'{pub_date.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        pub_date, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(pub_date), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor('Некорректный курсор.')
+
+
+def after_cursor(queryset, cursor):
+    """
+    Лента по (-pub_date, -pk), начиная после курсора. Страница
+    выбирается по индексу, без OFFSET.
+    """
+    queryset = queryset.order_by('-pub_date', '-pk')
+    if cursor:
+        pub_date, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+        )
+    return queryset
+
+
+class CursorPage:
+    """
+    Страница ленты после курсора. Читается одним запросом на
+    per_page + 1 строк, без COUNT(*), поэтому скорость не зависит от
+    номера страницы и размера ленты.
+    """
+    is_cursor_page = True
+
+    def __init__(self, queryset, cursor, per_page):
+        rows = list(after_cursor(queryset, cursor)[:per_page + 1])
+        self.object_list = rows[:per_page]
+        self.cursor = cursor
+        self.next_cursor = None
+        if len(rows) > per_page:
+            last = self.object_list[-1]
+            self.next_cursor = encode_cursor(last.pub_date, last.pk)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __contains__(self, item):
+        return item in self.object_list
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def estimated_count(queryset):
+    """
+    Примерное число строк таблицы из статистики базы данных или None,
+    если оценки нет. Оценивается только запрос без условий.
+    """
+    query = getattr(queryset, 'query', None)
+    if query is None or query.where or query.distinct or query.combinator:
+        return None
+    connection = connections[queryset.db]
+    sql = ESTIMATE_QUERIES.get(connection.vendor)
+    if sql is None:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # В SQLite таблицы статистики нет, пока не выполнен ANALYZE.
+        return None
+    if row is None:
+        return None
+    estimate = int(float(str(row[0]).split()[0]))
+    return estimate if estimate > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator, который для больших таблиц без фильтров берёт число
+    строк из статистики базы вместо COUNT(*) по всей таблице.
+    """
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is not None and estimate >= self.estimate_threshold:
+            return estimate
+        return super().count
+
+
+def page_window(page, on_each_side=2, on_ends=1):
+    """
+    Укороченный список номеров страниц: on_ends крайних страниц и по
+    on_each_side страниц вокруг текущей. Пропуски обозначены None.
+    """
+    num_pages = page.paginator.num_pages
+    numbers = set(range(1, min(on_ends, num_pages) + 1))
+    numbers.update(range(max(num_pages - on_ends + 1, 1), num_pages + 1))
+    numbers.update(range(
+        max(page.number - on_each_side, 1),
+        min(page.number + on_each_side, num_pages) + 1,
+    ))
+    window = []
+    for number in sorted(numbers):
+        if window and number - window[-1] == 2:
+            # Пропуск в одну страницу показываем номером.
+            window.append(number - 1)
+        elif window and number - window[-1] > 2:
+            window.append(None)
+        window.append(number)
+    return window
+
+
+class CachedCountPaginator(EstimatedCountPaginator):
+    """
+    Paginator для лент: число объектов хранится в кеше под ключом
+    ленты count_key не дольше PAGINATOR_COUNT_TIMEOUT секунд и
+    сбрасывается через invalidate_counts() при изменении ленты.
+    """
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        key = COUNT_KEY.format(self.count_key)
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(
+                key, count, getattr(settings, 'PAGINATOR_COUNT_TIMEOUT', 60)
+            )
+        return count
+
+    def page(self, number):
+        # Срез не обрезается по count: если число из кеша устарело и
+        # меньше настоящего, страница всё равно будет полной.
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top += self.orphans
+        return self._get_page(self.object_list[bottom:top], number, self)
+
+
+def invalidate_counts(*count_keys):
+    cache.delete_many([COUNT_KEY.format(key) for key in count_keys])
@@ -0,0 +1,65 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'WARMUP_WORKERS', 1),
+            thread_name_prefix='warmup',
+        )
+    return _executor
+
+
+def _run(key, func, args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Не удалось прогреть %s', key)
+    finally:
+        with _executor_lock:
+            _pending.discard(key)
+        connection.close()
+
+
+def _enqueue(key, func, args):
+    with _executor_lock:
+        limit = getattr(settings, 'WARMUP_QUEUE_SIZE', 16)
+        if key in _pending or len(_pending) >= limit:
+            return
+        _pending.add(key)
+        executor = _get_executor()
+    executor.submit(_run, key, func, args)
+
+
+def warm_up(key, func, *args):
+    """
+    Выполняет func(*args) в фоне после коммита текущей транзакции.
+    Пул потоков небольшой, а очередь ограничена WARMUP_QUEUE_SIZE:
+    если она заполнена или задача с тем же key уже ждёт, прогрев
+    пропускается, чтобы не отнимать ресурсы у обычных запросов.
+    """
+    if not getattr(settings, 'WARMUP_ENABLED', True):
+        return
+    transaction.on_commit(lambda: _enqueue(key, func, args))
+
+
+def add_links(response, links):
+    """Добавляет к ответу заголовок Link из пар (url, параметры)."""
+    values = [f'<{url}>; {params}' for url, params in links]
+    if response.has_header('Link'):
+        values.insert(0, response['Link'])
+    if values:
+        response['Link'] = ', '.join(values)
+    return response
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .views import too_many_requests
+
+logger = logging.getLogger(__name__)
+
+KEY = 'ratelimit:{}:{}:{}'
+UNITS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+LOCAL_MAX_KEYS = 10000
+
+
+def parse_rate(rate):
+    """'20/m' -> (20, 60): ёмкость корзины и период пополнения."""
+    count, unit = rate.split('/')
+    return int(count), UNITS[unit[0]]
+
+
+class LocalBuckets:
+    """
+    Token bucket в памяти процесса: запасной вариант, когда кеш
+    недоступен. Жетоны пополняются непрерывно.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, period, now, cost=1):
+        refill = capacity / period
+        with self.lock:
+            if len(self.buckets) > LOCAL_MAX_KEYS:
+                # Корзины, которые успели наполниться, можно забыть.
+                self.buckets = {
+                    bucket_key: bucket
+                    for bucket_key, bucket in self.buckets.items()
+                    if now - bucket[1] < bucket[2]
+                }
+            tokens, updated, _ = self.buckets.get(key, (capacity, now, 0))
+            tokens = min(capacity, tokens + (now - updated) * refill)
+            if tokens >= cost:
+                self.buckets[key] = (tokens - cost, now, period)
+                return 0
+            self.buckets[key] = (tokens, now, period)
+            return (cost - tokens) / refill
+
+
+_local = LocalBuckets()
+
+
+def take(scope, ident, rate, now=None, cost=1):
+    """
+    Забирает cost жетонов из корзины ident для scope. Возвращает 0,
+    если запрос пропущен, иначе через сколько секунд можно повторить.
+
+    В кеше корзина — атомарный счётчик на период: она наполняется
+    целиком в начале каждого периода, а запрос стоит один incr. Если
+    кеш RATELIMIT_CACHE_ALIAS недоступен, используется LocalBuckets.
+    """
+    capacity, period = parse_rate(rate)
+    now = time.time() if now is None else now
+    window = int(now // period)
+    key = KEY.format(scope, ident, window)
+    cache = caches[getattr(settings, 'RATELIMIT_CACHE_ALIAS', 'shared')]
+    try:
+        try:
+            count = cache.incr(key, cost)
+        except ValueError:
+            # Первый запрос в периоде: счётчика ещё нет.
+            if cache.add(key, cost, period + 1):
+                count = cost
+            else:
+                count = cache.incr(key, cost)
+    except Exception:
+        logger.warning('Кеш ограничения частоты недоступен', exc_info=True)
+        return _local.take(f'{scope}:{ident}', capacity, period, now, cost)
+    if count <= capacity:
+        return 0
+    return (window + 1) * period - now
+
+
+def client_id(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{request.META.get("REMOTE_ADDR", "")}'
+
+
+def check(request, scope, cost=1):
+    """
+    Расходует cost жетонов политики RATE_LIMITS[scope] для клиента
+    запроса. Возвращает 0 или через сколько секунд можно повторить;
+    без политики запрос не ограничивается.
+    """
+    policy = getattr(settings, 'RATE_LIMITS', {}).get(scope)
+    if not policy:
+        return 0
+    return take(scope, client_id(request), policy, cost=cost)
+
+
+def rate_limit(scope, methods=('POST',)):
+    """
+    Ограничивает частоту запросов methods к view: не больше
+    RATE_LIMITS[scope] (например '20/m') на пользователя, а для
+    анонимов на IP. Без политики в RATE_LIMITS или с None запросы не
+    ограничиваются. Сверх лимита отвечает 429 с заголовком Retry-After.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method in methods:
+                retry_after = check(request, scope)
+                if retry_after:
+                    return too_many_requests(request, retry_after)
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
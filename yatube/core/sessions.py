@@ -0,0 +1,28 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+CHUNK_SIZE = 1000
+
+
+def clear_expired(chunk_size=CHUNK_SIZE, pause=0):
+    """
+    Удаляет истёкшие сессии из базы порциями по chunk_size, каждая
+    отдельным коротким DELETE, с паузой pause секунд между ними, чтобы
+    не держать блокировку записи SQLite. В отличие от clearsessions
+    не удаляет всё одним запросом. Возвращает число удалённых сессий.
+    """
+    now = timezone.now()
+    expired = Session.objects.filter(expire_date__lt=now).values_list(
+        'session_key', flat=True
+    )
+    total = 0
+    while True:
+        keys = list(expired[:chunk_size])
+        if not keys:
+            return total
+        Session.objects.filter(session_key__in=keys).delete()
+        total += len(keys)
+        if pause:
+            time.sleep(pause)
@@ -0,0 +1,131 @@
+import gzip
+import hashlib
+import os
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import locks
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SHARD_DEPTH = 2
+SHARD_WIDTH = 2
+
+LOCK_NAME = '.storage.lock'
+
+
+def file_hash(content):
+    """Считает sha256 содержимого файла, читая его по частям."""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def hashed_path(directory, digest, extension):
+    """
+    Путь вида <directory>/ab/cd/abcd...<extension>: файлы раскладываются
+    по вложенным каталогам, чтобы ни в одном не было слишком много файлов.
+    """
+    shards = [
+        digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH]
+        for i in range(SHARD_DEPTH)
+    ]
+    return '/'.join(
+        part for part in (directory, *shards, digest + extension.lower())
+        if part
+    )
+
+
+def gzip_compress(content):
+    """
+    gzip.compress с нулевым временем в заголовке, чтобы одинаковые
+    файлы сжимались одинаково. Параметр mtime у gzip.compress есть
+    только с Python 3.8.
+    """
+    buffer = BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as file_:
+        file_.write(content)
+    return buffer.getvalue()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, в котором имя файла определяется хешем его содержимого.
+    Одинаковые файлы хранятся один раз: повторное сохранение возвращает
+    имя уже существующего файла и обновляет время его изменения, чтобы
+    posts.images.release_image не удалил файл, пока новая ссылка на
+    него ещё не сохранена в базе.
+    """
+
+    @contextmanager
+    def locked(self):
+        """Блокировка между процессами для проверки и удаления файлов."""
+        os.makedirs(self.location, exist_ok=True)
+        with open(os.path.join(self.location, LOCK_NAME), 'ab') as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def hashed_name(self, name, content):
+        digest = getattr(content, 'content_hash', None) or file_hash(content)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1]
+        return hashed_path(directory, digest, extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        with self.locked():
+            if self.exists(name):
+                os.utime(self.path(name))
+                return name
+        return self._save(name, content)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage, который рядом с каждым файлом с хешем
+    в имени сохраняет сжатые копии .gz и, если установлен brotli, .br.
+    """
+    compressible_extensions = (
+        '.css', '.js', '.svg', '.txt', '.html', '.json', '.xml', '.ico',
+    )
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(self.compressible_extensions):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as source:
+            content = source.read()
+        variants = [('.gz', gzip_compress(content))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content)))
+        for suffix, compressed in variants:
+            if len(compressed) >= len(content):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
@@ -0,0 +1,198 @@
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+from functools import update_wrapper
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY = 60 * 60
+ABANDONED_ERROR = 'Исполнитель не завершил задачу ни за одну из попыток.'
+
+
+class BackgroundTask:
+    """
+    Функция, вызов которой можно отложить: task.delay(*args, **kwargs)
+    сохраняет вызов в таблицу задач, а выполняет его команда run_tasks.
+    Аргументы должны сериализоваться в JSON. При TASKS_EAGER = True
+    функция вызывается сразу, а исключения не перехватываются.
+    """
+
+    def __init__(self, func, max_attempts, retry_delay):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        if getattr(settings, 'TASKS_EAGER', False):
+            self.func(*args, **kwargs)
+            return None
+        # Задача записывается в текущей транзакции и видна исполнителям
+        # только после её коммита.
+        return Task.objects.create(
+            name=self.name,
+            params=json.dumps({'args': args, 'kwargs': kwargs}),
+            max_attempts=self.max_attempts,
+            run_at=timezone.now(),
+        )
+
+    def backoff(self, attempts):
+        """Пауза перед следующей попыткой: растёт вдвое с каждой."""
+        delay = self.retry_delay
+        if delay is None:
+            delay = getattr(settings, 'TASKS_RETRY_DELAY', 10)
+        return min(delay * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def task(max_attempts=3, retry_delay=None):
+    """Декоратор: делает функцию модуля фоновой задачей."""
+    def decorator(func):
+        return BackgroundTask(func, max_attempts, retry_delay)
+    return decorator
+
+
+def _lock_timeout():
+    return getattr(settings, 'TASKS_LOCK_TIMEOUT', 10 * 60)
+
+
+def _stale(now):
+    # Задачи, которые исполнитель не продлевал дольше
+    # TASKS_LOCK_TIMEOUT секунд, например после его остановки.
+    stale = now - timedelta(seconds=_lock_timeout())
+    return Q(status=Task.RUNNING, locked_at__lt=stale)
+
+
+def _due(now):
+    # Брошенные задачи выдаются повторно, пока не кончились попытки.
+    return Q(status=Task.PENDING, run_at__lte=now) | (
+        _stale(now) & Q(attempts__lt=F('max_attempts'))
+    )
+
+
+def claim():
+    """
+    Забирает в работу одну задачу, срок которой наступил, или
+    возвращает None. Задачу, которую успел взять другой исполнитель,
+    пропускает. Брошенную задачу, у которой кончились попытки,
+    например если она каждый раз роняет исполнителя, помечает
+    ошибкой.
+    """
+    now = timezone.now()
+    Task.objects.filter(
+        _stale(now), attempts__gte=F('max_attempts')
+    ).update(status=Task.FAILED, error=ABANDONED_ERROR)
+    candidates = (
+        Task.objects.filter(_due(now))
+        .order_by('run_at', 'pk')
+        .values_list('pk', flat=True)[:10]
+    )
+    for pk in candidates:
+        if Task.objects.filter(_due(now), pk=pk).update(
+            status=Task.RUNNING,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        ):
+            return Task.objects.get(pk=pk)
+    return None
+
+
+class Lease(threading.Thread):
+    """
+    Продлевает взятую задачу, пока она выполняется: раз в треть
+    TASKS_LOCK_TIMEOUT обновляет locked_at, поэтому долгую задачу не
+    выдают второму исполнителю. Продлевается только своя попытка: если
+    задачу всё же выдали повторно, attempts у неё уже другой.
+    """
+
+    def __init__(self, task_row):
+        super().__init__(name=f'task-lease-{task_row.pk}', daemon=True)
+        self.task_row = task_row
+        self.interval = _lock_timeout() / 3
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    Task.objects.filter(
+                        pk=self.task_row.pk,
+                        status=Task.RUNNING,
+                        attempts=self.task_row.attempts,
+                    ).update(locked_at=timezone.now())
+                except Exception:
+                    logger.exception(
+                        'Не удалось продлить задачу %s', self.task_row
+                    )
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def execute(task_row):
+    """
+    Выполняет задачу. Выполненная задача удаляется, после ошибки
+    ставится на повтор с растущей паузой, а когда попытки кончились,
+    остаётся в таблице с состоянием «Ошибка».
+    """
+    tasks = Task.objects.filter(pk=task_row.pk)
+    background_task = None
+    lease = Lease(task_row)
+    lease.start()
+    try:
+        background_task = import_string(task_row.name)
+        params = json.loads(task_row.params)
+        background_task(*params['args'], **params['kwargs'])
+    except Exception as error:
+        logger.exception('Фоновая задача %s завершилась ошибкой', task_row)
+        if (
+            isinstance(background_task, BackgroundTask)
+            and task_row.attempts < task_row.max_attempts
+        ):
+            delay = background_task.backoff(task_row.attempts)
+            tasks.update(
+                status=Task.PENDING,
+                run_at=timezone.now() + timedelta(seconds=delay),
+                error=str(error),
+            )
+        else:
+            tasks.update(status=Task.FAILED, error=str(error))
+        return False
+    finally:
+        lease.stop()
+    tasks.delete()
+    return True
+
+
+def work(once=False, poll=1):
+    """
+    Цикл исполнителя: берёт и выполняет задачи по одной. С once=True
+    завершается, когда задач, готовых к выполнению, не осталось.
+    Возвращает число выполненных задач.
+    """
+    done = 0
+    while True:
+        task_row = claim()
+        if task_row is None:
+            if once:
+                return done
+            time.sleep(poll)
+            continue
+        execute(task_row)
+        done += 1
@@ -0,0 +1,15 @@
+from django import template
+
+from core.thumbnails import resolve_thumbnails as _resolve_thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def resolve_thumbnails(page_obj, geometry, **options):
+    """
+    Заполняет post.thumbnail для всех постов страницы одним запросом.
+    Использование: {% resolve_thumbnails page_obj "960x339" crop="center" %}
+    """
+    _resolve_thumbnails(page_obj, geometry, **options)
+    return ''
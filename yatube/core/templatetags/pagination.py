@@ -0,0 +1,14 @@
+from django import template
+
+from core.pagination import page_window as _page_window
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page_obj, on_each_side=2, on_ends=1):
+    """
+    Номера страниц для паджинатора, пропуски равны None.
+    Использование: {% page_window page_obj as pages %}
+    """
+    return _page_window(page_obj, on_each_side, on_ends)
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def isolated_caches():
+    """
+    override_settings, который заменяет общий файловый кеш кешем в
+    памяти: тесты не пишут в каталог кеша проекта и не видят записей
+    прошлых запусков. Кеш в памяти без LOCATION разделяет хранилище с
+    кешем default, поэтому cache.clear() очищает оба.
+    """
+    caches = dict(settings.CACHES)
+    caches['shared'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+    return override_settings(CACHES=caches)
+
+
+class TestRunner(DiscoverRunner):
+    """Запускает тесты manage.py test с isolated_caches."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._caches = isolated_caches()
+        self._caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches.disable()
+        super().teardown_test_environment(**kwargs)
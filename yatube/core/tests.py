@@ -1,7 +1,76 @@
+import gzip
+import json
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail import send_mass_mail
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (Client, SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from posts.models import Post
+
+from . import auth
+from .cache import SharedFileCache
+from .checks import check_static_references
+from .mail import deliver
+from .models import Task
+from .pagination import (CachedCountPaginator, EstimatedCountPaginator,
+                         estimated_count, invalidate_counts, page_window)
+from .prefetch import add_links, warm_up
+from .ratelimit import LocalBuckets, take
+from .sessions import clear_expired
+from .storage import ContentAddressedStorage, gzip_compress
+from .tasks import ABANDONED_ERROR, claim, execute, task, work
+from .thumbnails import resolve_thumbnails
+from .views import accepted_encodings
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+TASK_CALLS = []
+
+
+@task(max_attempts=2, retry_delay=5)
+def record_call(value):
+    if value == 'ошибка':
+        raise ValueError('Ошибка задачи')
+    TASK_CALLS.append(value)
+
+
+@task()
+def slow_call(seconds):
+    time.sleep(seconds)
+    # Так задачу попытался бы взять второй исполнитель.
+    TASK_CALLS.append(claim())
+
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 
 User = get_user_model()
 
@@ -17,3 +86,724 @@ class CoreViewsTests(TestCase):
         response = self.guest_client.get('/unexisting_page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    THUMBNAIL_GENERATE_ASYNC=False,
+)
+class ResolveThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        for i in range(3):
+            Post.objects.create(
+                author=cls.author,
+                text=f'Тестовый пост {i}',
+                image=SimpleUploadedFile(
+                    name=f'small_{i}.gif',
+                    content=SMALL_GIF,
+                    content_type='image/gif',
+                ),
+            )
+        Post.objects.create(author=cls.author, text='Пост без картинки')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_resolved_thumbnails_are_read_in_one_query(self):
+        """
+        Миниатюры всей страницы читаются из KV-хранилища одним запросом.
+        """
+        resolve_thumbnails(list(Post.objects.all()), '960x339', crop='center')
+        cache.clear()
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(1):
+            resolve_thumbnails(posts, '960x339', crop='center')
+        with_image = [post for post in posts if post.image]
+        self.assertEqual(len(with_image), 3)
+        for post in posts:
+            with self.subTest(post=post.text):
+                if post.image:
+                    self.assertIsNotNone(post.thumbnail)
+                    self.assertTrue(post.thumbnail.url)
+                else:
+                    self.assertIsNone(post.thumbnail)
+        with self.assertNumQueries(0):
+            resolve_thumbnails(posts, '960x339', crop='center')
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def tearDown(self):
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def test_file_is_stored_under_sharded_hash_path(self):
+        """
+        Файл сохраняется по пути из хеша содержимого.
+        """
+        name = self.storage.save('posts/a.gif', ContentFile(SMALL_GIF))
+        directory, first, second, filename = name.split('/')
+        self.assertEqual(directory, 'posts')
+        self.assertTrue(filename.startswith(first + second))
+        self.assertTrue(filename.endswith('.gif'))
+        self.assertTrue(self.storage.exists(name))
+
+    def test_identical_files_are_stored_once(self):
+        """
+        Одинаковое содержимое сохраняется в один файл.
+        """
+        first = self.storage.save('posts/a.gif', ContentFile(SMALL_GIF))
+        second = self.storage.save('posts/b.gif', ContentFile(SMALL_GIF))
+        self.assertEqual(first, second)
+        other = self.storage.save('posts/c.gif', ContentFile(b'other'))
+        self.assertNotEqual(first, other)
+
+
+class StaticFilesTests(TestCase):
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.guest_client = Client()
+
+    def tearDown(self):
+        shutil.rmtree(self.static_root, ignore_errors=True)
+
+    def test_templates_use_static_tag(self):
+        """
+        Шаблоны ссылаются на существующую статику через {% static %}.
+        """
+        self.assertEqual(check_static_references(None), [])
+
+    def test_collected_files_are_hashed_and_compressed(self):
+        """
+        collectstatic создаёт файлы с хешем и сжатые копии, которые
+        отдаются с долгим сроком кеширования.
+        """
+        with self.settings(
+            STATIC_ROOT=self.static_root,
+            STATICFILES_STORAGE=(
+                'core.storage.CompressedManifestStaticFilesStorage'
+            ),
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            url = staticfiles_storage.url('css/bootstrap.min.css')
+            name = staticfiles_storage.stored_name('css/bootstrap.min.css')
+            self.assertNotEqual(name, 'css/bootstrap.min.css')
+            self.assertTrue(staticfiles_storage.exists(name + '.gz'))
+            response = self.guest_client.get(
+                url, HTTP_ACCEPT_ENCODING='gzip, deflate'
+            )
+            refused = self.guest_client.get(
+                url, HTTP_ACCEPT_ENCODING='gzip;q=0, deflate'
+            )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(refused.status_code, HTTPStatus.OK)
+        self.assertFalse(refused.has_header('Content-Encoding'))
+
+    def test_accepted_encodings(self):
+        """Кодировки с q=0 не отдаются, * разрешает неперечисленные."""
+        cases = {
+            '': [],
+            'gzip, deflate': ['gzip'],
+            'gzip;q=0, br': ['br'],
+            'GZIP; Q=0.5, br;q=0.8': ['br', 'gzip'],
+            'gzip;q=1, br;q=0.5': ['gzip', 'br'],
+            '*': ['br', 'gzip'],
+            '*;q=0, gzip': ['gzip'],
+            'br;q=0, *': ['gzip'],
+            'gzip;q=abc': [],
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(
+                    [coding for coding, _ in accepted_encodings(header)],
+                    expected,
+                )
+
+    def test_gzip_copies_are_reproducible(self):
+        """Сжатая копия не зависит от времени сжатия."""
+        content = b'body { color: black; }' * 10
+        compressed = gzip_compress(content)
+        self.assertEqual(gzip.decompress(compressed), content)
+        with mock.patch('time.time', return_value=0):
+            self.assertEqual(gzip_compress(content), compressed)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='HasNoName')
+        Post.objects.bulk_create(
+            Post(author=author, text='Пост') for _ in range(30)
+        )
+
+    def test_estimate_from_statistics(self):
+        """Без фильтров число строк берётся из статистики базы."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(estimated_count(Post.objects.all()), 30)
+        self.assertIsNone(estimated_count(Post.objects.filter(pk__gt=1)))
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        paginator.estimate_threshold = 20
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 30)
+
+    def test_small_tables_are_counted(self):
+        """Ниже порога выполняется обычный COUNT(*)."""
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.count, 30)
+        paginator = EstimatedCountPaginator(list(range(5)), 10)
+        self.assertEqual(paginator.count, 5)
+
+
+class CachedCountPaginatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_page_window(self):
+        """Показываются крайние страницы и соседи текущей."""
+        paginator = CachedCountPaginator(list(range(300)), 10)
+        windows = {
+            1: [1, 2, 3, None, 30],
+            5: [1, 2, 3, 4, 5, 6, 7, None, 30],
+            15: [1, None, 13, 14, 15, 16, 17, None, 30],
+            30: [1, None, 28, 29, 30],
+        }
+        for number, window in windows.items():
+            with self.subTest(number=number):
+                self.assertEqual(page_window(paginator.page(number)), window)
+
+    def test_count_is_cached_per_key(self):
+        """Число объектов берётся из кеша до сброса."""
+        objects = list(range(25))
+        self.assertEqual(CachedCountPaginator(objects, 10, 'feed').count, 25)
+        objects.extend(range(10))
+        paginator = CachedCountPaginator(objects, 10, 'feed')
+        self.assertEqual(paginator.count, 25)
+        self.assertEqual(len(paginator.page(3)), 10)
+        invalidate_counts('feed')
+        self.assertEqual(CachedCountPaginator(objects, 10, 'feed').count, 35)
+
+
+@override_settings(WARMUP_QUEUE_SIZE=1)
+class WarmUpTests(SimpleTestCase):
+    def test_queue_is_bounded(self):
+        """Пока очередь прогрева заполнена, новые задачи отбрасываются."""
+        started = threading.Event()
+        release = threading.Event()
+        done = threading.Event()
+        calls = []
+
+        def slow():
+            started.set()
+            release.wait(5)
+
+        warm_up('slow', slow)
+        started.wait(5)
+        warm_up('other', calls.append, 'other')
+        release.set()
+        # Место в очереди освобождается после завершения задачи.
+        for _ in range(50):
+            warm_up('last', done.set)
+            if done.wait(0.1):
+                break
+        self.assertEqual(calls, [])
+        self.assertTrue(done.is_set())
+
+    def test_add_links(self):
+        """Заголовок Link дополняется, а не перезаписывается."""
+        response = HttpResponse()
+        add_links(response, [('/a', 'rel="next"')])
+        add_links(response, [('/b.png', 'rel="prefetch"; as="image"')])
+        self.assertEqual(
+            response['Link'],
+            '</a>; rel="next", </b.png>; rel="prefetch"; as="image"',
+        )
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        TASK_CALLS.clear()
+
+    def test_eager_mode_runs_immediately(self):
+        """При TASKS_EAGER задача выполняется сразу и не сохраняется."""
+        with self.settings(TASKS_EAGER=True):
+            self.assertIsNone(record_call.delay('сразу'))
+        self.assertEqual(TASK_CALLS, ['сразу'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_delay_stores_task_and_worker_runs_it(self):
+        """Задача выполняется командой и удаляется из очереди."""
+        task_row = record_call.delay('из очереди')
+        self.assertEqual(task_row.name, 'core.tests.record_call')
+        self.assertEqual(TASK_CALLS, [])
+        out = StringIO()
+        call_command('run_tasks', '--once', '--workers=1', stdout=out)
+        self.assertIn('Выполнено задач: 1', out.getvalue())
+        self.assertEqual(TASK_CALLS, ['из очереди'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_task_is_retried_with_backoff(self):
+        """
+        После ошибки задача ждёт повтора с растущей паузой, а когда
+        попытки кончились, остаётся с состоянием «Ошибка».
+        """
+        record_call.delay('ошибка')
+        self.assertFalse(execute(claim()))
+        task_row = Task.objects.get()
+        self.assertEqual(task_row.status, Task.PENDING)
+        self.assertEqual(task_row.attempts, 1)
+        self.assertEqual(task_row.error, 'Ошибка задачи')
+        self.assertGreater(
+            task_row.run_at, timezone.now() + timedelta(seconds=4)
+        )
+        self.assertIsNone(claim())
+        Task.objects.update(run_at=timezone.now())
+        self.assertFalse(execute(claim()))
+        task_row.refresh_from_db()
+        self.assertEqual(task_row.status, Task.FAILED)
+        self.assertEqual(task_row.attempts, 2)
+        self.assertIsNone(claim())
+        self.assertEqual(record_call.backoff(3), 20)
+
+    def test_stale_running_task_is_reclaimed(self):
+        """Задачу, которую давно не продлевали, выдают повторно."""
+        record_call.delay('повтор')
+        self.assertIsNotNone(claim())
+        self.assertIsNone(claim())
+        Task.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        task_row = claim()
+        self.assertEqual(task_row.attempts, 2)
+        self.assertTrue(execute(task_row))
+        self.assertEqual(TASK_CALLS, ['повтор'])
+
+    def test_abandoned_task_fails_after_max_attempts(self):
+        """
+        Задачу, которую бросали max_attempts раз, больше не выдают, а
+        помечают ошибкой.
+        """
+        record_call.delay('роняет исполнителя')
+        for attempt in (1, 2):
+            task_row = claim()
+            self.assertEqual(task_row.attempts, attempt)
+            Task.objects.update(
+                locked_at=timezone.now() - timedelta(hours=1)
+            )
+        self.assertIsNone(claim())
+        task_row = Task.objects.get()
+        self.assertEqual(task_row.status, Task.FAILED)
+        self.assertEqual(task_row.attempts, 2)
+        self.assertEqual(task_row.error, ABANDONED_ERROR)
+        self.assertEqual(TASK_CALLS, [])
+
+
+class TaskLeaseTests(TransactionTestCase):
+    def setUp(self):
+        TASK_CALLS.clear()
+
+    @override_settings(TASKS_LOCK_TIMEOUT=0.3)
+    def test_running_task_is_not_reclaimed(self):
+        """
+        Пока задача выполняется, исполнитель продлевает её, и задачу
+        не выдают повторно, даже если она дольше TASKS_LOCK_TIMEOUT.
+        """
+        slow_call.delay(0.6)
+        self.assertTrue(execute(claim()))
+        self.assertEqual(TASK_CALLS, [None])
+        self.assertFalse(Task.objects.exists())
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_BATCH_SIZE=2,
+)
+class QueuedEmailTests(TestCase):
+    def payloads(self, count):
+        messages = [
+            (f'Тема {i}', 'Текст', None, [f'user{i}@example.com'])
+            for i in range(count)
+        ]
+        send_mass_mail(messages)
+        return [
+            payload
+            for task_row in Task.objects.order_by('pk')
+            for payload in json.loads(task_row.params)['args'][0]
+        ]
+
+    def test_password_reset_email_is_queued(self):
+        """Письмо сброса пароля ставится в очередь и уходит из неё."""
+        User.objects.create_user(
+            username='forgetful',
+            email='forgetful@example.com',
+            password='pass',
+        )
+        response = self.client.post(
+            '/auth/password_reset/', {'email': 'forgetful@example.com'}
+        )
+        self.assertRedirects(response, '/auth/password_reset/done/')
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(work(once=True), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['forgetful@example.com'])
+        self.assertIn('/auth/reset/', mail.outbox[0].body)
+
+    def test_messages_are_sent_in_batches(self):
+        """Письма ставятся в очередь порциями по EMAIL_BATCH_SIZE."""
+        self.payloads(3)
+        self.assertEqual(Task.objects.count(), 2)
+        self.assertEqual(work(once=True), 2)
+        self.assertEqual(
+            sorted(message.subject for message in mail.outbox),
+            ['Тема 0', 'Тема 1', 'Тема 2'],
+        )
+
+    def test_failed_delivery_requeues_only_unsent(self):
+        """
+        Если письмо в середине порции не ушло, в очередь ставится только
+        остаток, а ошибка на первом письме уходит в повтор с паузой.
+        """
+        payloads = self.payloads(3)
+        Task.objects.all().delete()
+        with mock.patch.object(
+            locmem.EmailBackend,
+            'send_messages',
+            side_effect=[1, OSError('Сервер недоступен')],
+        ):
+            deliver(payloads)
+        remainder = json.loads(Task.objects.get().params)['args'][0]
+        self.assertEqual(
+            [payload['subject'] for payload in remainder],
+            ['Тема 1', 'Тема 2'],
+        )
+        with mock.patch.object(
+            locmem.EmailBackend,
+            'send_messages',
+            side_effect=OSError('Сервер недоступен'),
+        ):
+            self.assertFalse(execute(claim()))
+        task_row = Task.objects.get()
+        self.assertEqual(task_row.status, Task.PENDING)
+        self.assertEqual(task_row.attempts, 1)
+        self.assertEqual(task_row.error, 'Сервер недоступен')
+        self.assertGreater(task_row.run_at, timezone.now())
+        self.assertEqual(mail.outbox, [])
+        Task.objects.update(run_at=timezone.now())
+        self.assertEqual(work(once=True), 1)
+        self.assertEqual(
+            [message.subject for message in mail.outbox], ['Тема 1', 'Тема 2']
+        )
+
+
+class SharedFileCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.cache = SharedFileCache(self.location, {
+            'OPTIONS': {'MAX_ENTRIES': 2, 'CULL_INTERVAL': 60},
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def test_concurrent_incr_is_atomic(self):
+        """Параллельные incr не теряют приращений."""
+        self.cache.add('counter', 0)
+
+        def increment():
+            for _ in range(25):
+                self.cache.incr('counter')
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 100)
+        self.assertFalse(self.cache.add('counter', 0))
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_keeps_expiry(self):
+        """incr не продлевает срок записи."""
+        self.cache.set('counter', 1, 60)
+        with mock.patch('time.time', return_value=time.time() + 30):
+            self.assertEqual(self.cache.incr('counter'), 2)
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.assertIsNone(self.cache.get('counter'))
+
+    def test_directory_is_culled_once_per_interval(self):
+        """Каталог просматривается не при каждой записи."""
+        with mock.patch.object(
+            SharedFileCache, '_list_cache_files', return_value=[]
+        ) as list_files:
+            for i in range(5):
+                self.cache.set(f'key{i}', i)
+        self.assertEqual(list_files.call_count, 1)
+
+
+class SessionTests(TestCase):
+    def test_authenticated_request_reads_session_from_cache(self):
+        """Сессия авторизованного запроса читается из кеша, а не базы."""
+        client = Client()
+        client.force_login(User.objects.create_user(username='reader'))
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFalse([
+            query for query in context.captured_queries
+            if 'django_session' in query['sql']
+        ])
+
+    def test_expired_sessions_are_deleted_in_chunks(self):
+        """Истёкшие сессии удаляются порциями, живые остаются."""
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(
+                session_key=f'expired{i}',
+                session_data='',
+                expire_date=now - timedelta(days=1),
+            )
+        Session.objects.create(
+            session_key='alive',
+            session_data='',
+            expire_date=now + timedelta(days=1),
+        )
+        with self.assertNumQueries(7):
+            self.assertEqual(clear_expired(chunk_size=2), 5)
+        self.assertEqual(
+            list(Session.objects.values_list('session_key', flat=True)),
+            ['alive'],
+        )
+        out = StringIO()
+        call_command('clear_expired_sessions', '--pause=0', stdout=out)
+        self.assertIn('Удалено сессий: 0', out.getvalue())
+
+    def test_benchmark_sessions(self):
+        """Сравнение движков сессий считает запросы к таблице сессий."""
+        out = StringIO()
+        call_command(
+            'benchmark_sessions',
+            '--requests=2',
+            '--engines', 'db', 'signed_cookies',
+            stdout=out,
+        )
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('из них к сессиям: 1', lines[0])
+        self.assertIn('из них к сессиям: 0', lines[1])
+        self.assertFalse(
+            User.objects.filter(username='session-benchmark').exists()
+        )
+
+
+class CachedUserTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='cached', password='old-pass'
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.client.get('/')
+
+    def user_queries(self, client):
+        """Запрос к странице и запросы, загружавшие пользователя."""
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/follow/')
+        queries = [
+            query for query in context.captured_queries
+            if 'FROM "auth_user" WHERE "auth_user"."id"' in query['sql']
+        ]
+        return response, queries
+
+    def test_user_is_loaded_from_cache(self):
+        """
+        Пользователь с сессией берётся из кеша без запроса к БД.
+        """
+        response, queries = self.user_queries(self.client)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(queries, [])
+        self.assertEqual(response.context['user'], self.user)
+        self.assertEqual(response.context['user'].username, 'cached')
+
+    def test_snapshot_has_no_password(self):
+        """
+        Хеш пароля не попадает в кеш, у пользователя из кеша он
+        догружается из БД при обращении.
+        """
+        key = auth.USER_KEY.format(
+            self.user.pk, self.user.get_session_auth_hash()
+        )
+        snapshot = caches['shared'].get(key)
+        self.assertEqual(snapshot['username'], 'cached')
+        self.assertNotIn('password', snapshot)
+        response, _ = self.user_queries(self.client)
+        user = response.context['user']
+        self.assertEqual(user.get_deferred_fields(), {'password'})
+        self.assertEqual(
+            user.get_session_auth_hash(), self.user.get_session_auth_hash()
+        )
+
+    def test_cached_user_save_keeps_password(self):
+        """
+        Сохранение пользователя из кеша не затирает отложенный пароль.
+        """
+        response, _ = self.user_queries(self.client)
+        user = response.context['user']._wrapped
+        user.first_name = 'Имя'
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Имя')
+        self.assertTrue(self.user.check_password('old-pass'))
+
+    def test_profile_change_invalidates_cache(self):
+        """
+        Изменение и деактивация пользователя сбрасывают его снимок.
+        """
+        self.user.first_name = 'Новое имя'
+        self.user.save()
+        response, queries = self.user_queries(self.client)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.context['user'].first_name, 'Новое имя')
+        self.user.is_active = False
+        self.user.save()
+        response, _ = self.user_queries(self.client)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_password_change_logs_out_other_sessions(self):
+        """
+        После смены пароля другие сессии пользователя недействительны.
+        """
+        other = Client()
+        other.login(username='cached', password='old-pass')
+        other.get('/')
+        response = self.client.post('/auth/password_change/', {
+            'old_password': 'old-pass',
+            'new_password1': 'new-secret-pass',
+            'new_password2': 'new-secret-pass',
+        })
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        response, _ = self.user_queries(self.client)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        response, _ = self.user_queries(other)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bucket_refills_each_period(self):
+        """
+        Корзина в кеше наполняется целиком в начале каждого периода.
+        """
+        now = 6000.0
+        self.assertEqual(take('test', 'a', '2/m', now), 0)
+        self.assertEqual(take('test', 'a', '2/m', now + 1), 0)
+        self.assertEqual(take('test', 'a', '2/m', now + 20), 40)
+        self.assertEqual(take('test', 'b', '2/m', now + 20), 0)
+        self.assertEqual(take('test', 'a', '2/m', now + 60), 0)
+        self.assertEqual(take('test', 'c', '2/m', now, cost=2), 0)
+        self.assertEqual(take('test', 'c', '2/m', now, cost=1), 60)
+
+    def test_local_fallback_when_cache_fails(self):
+        """
+        Если кеш недоступен, работают корзины в памяти процесса.
+        """
+        with mock.patch.object(
+            caches['shared'], 'incr',
+            side_effect=ConnectionError('Кеш недоступен'),
+        ):
+            self.assertEqual(take('test', 'a', '1/m', 100.0), 0)
+            self.assertEqual(take('test', 'a', '1/m', 130.0), 30)
+            self.assertEqual(take('test', 'a', '1/m', 160.0), 0)
+
+    def test_local_buckets_refill_continuously(self):
+        """
+        Корзины в памяти пополняются непрерывно.
+        """
+        buckets = LocalBuckets()
+        self.assertEqual(buckets.take('key', 2, 10, 0), 0)
+        self.assertEqual(buckets.take('key', 2, 10, 0), 0)
+        self.assertEqual(buckets.take('key', 2, 10, 0), 5)
+        self.assertEqual(buckets.take('key', 2, 10, 5), 0)
+        self.assertEqual(buckets.take('key', 2, 10, 5, cost=2), 10)
+
+    @override_settings(RATE_LIMITS={'add_comment': '2/m'})
+    def test_write_view_returns_429(self):
+        """
+        Сверх лимита изменяющая страница отвечает 429, чтение не
+        ограничено.
+        """
+        user = User.objects.create_user(username='bot')
+        post = Post.objects.create(author=user, text='Пост')
+        client = Client()
+        client.force_login(user)
+        url = f'/posts/{post.pk}/comment/'
+        for _ in range(2):
+            response = client.post(url, {'text': 'Спам'})
+            self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.assertEqual(client.get(f'/posts/{post.pk}/').status_code, 200)
+        response = client.post(url, {'text': 'Спам'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertTemplateUsed(response, 'core/429.html')
+        self.assertEqual(post.comments.count(), 2)
+
+    @override_settings(RATE_LIMITS={'signup': '1/m'})
+    def test_signup_is_limited_by_ip(self):
+        """
+        Регистрация анонимов ограничивается по IP.
+        """
+        data = {'username': 'new_user'}
+        self.assertNotEqual(
+            self.client.post('/auth/signup/', data).status_code,
+            HTTPStatus.TOO_MANY_REQUESTS,
+        )
+        response = self.client.post(
+            '/auth/signup/', data, REMOTE_ADDR='10.0.0.2'
+        )
+        self.assertNotEqual(
+            response.status_code, HTTPStatus.TOO_MANY_REQUESTS
+        )
+        response = self.client.post('/auth/signup/', data)
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+
+    @override_settings(RATE_LIMITS={'profile_follow': '2/m'})
+    def test_follow_and_unfollow_share_limit(self):
+        """
+        Подписка и отписка расходуют общий лимит.
+        """
+        user = User.objects.create_user(username='bot')
+        author = User.objects.create_user(username='author')
+        client = Client()
+        client.force_login(user)
+        client.get(f'/profile/{author.username}/follow/')
+        client.get(f'/profile/{author.username}/unfollow/')
+        response = client.get(f'/profile/{author.username}/follow/')
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        response = client.get(f'/profile/{author.username}/unfollow/')
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+
+    @override_settings(RATE_LIMITS={})
+    def test_scope_without_policy_is_not_limited(self):
+        """
+        Область без политики в RATE_LIMITS не ограничивается.
+        """
+        for _ in range(3):
+            self.assertEqual(
+                self.client.post(
+                    '/auth/signup/', {'username': 'new_user'}
+                ).status_code,
+                HTTPStatus.OK,
+            )
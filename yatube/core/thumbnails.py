@@ -0,0 +1,144 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+from sorl.thumbnail.shortcuts import get_thumbnail
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 1),
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def _thumbnail_file(source, geometry, options):
+    """
+    Возвращает ImageFile миниатюры с тем же именем, которое получил бы
+    sorl.thumbnail.get_thumbnail для тех же параметров.
+    """
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def get_many_raw(keys):
+    """
+    Читает значения ключей из KV-хранилища sorl: из cached_db одним
+    запросом, из других хранилищ через их API по ключу. Для ключей,
+    которых нет, значение None.
+    """
+    kvstore = default.kvstore
+    if not isinstance(kvstore._wrapped, cached_db_kvstore.KVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(
+            KVStoreModel.objects.filter(key__in=missing)
+            .values_list('key', 'value')
+        )
+        fetched = {
+            key: found.get(key, cached_db_kvstore.EMPTY_VALUE)
+            for key in missing
+        }
+        kvstore.cache.set_many(
+            fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        values.update(fetched)
+    return {
+        key: None if value == cached_db_kvstore.EMPTY_VALUE else value
+        for key, value in values.items()
+    }
+
+
+def _generate(file_, geometry, options, key):
+    try:
+        get_thumbnail(file_, geometry, **options)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру для %s', file_)
+    finally:
+        with _executor_lock:
+            _pending.discard(key)
+        connection.close()
+
+
+def _schedule(file_, geometry, options, key):
+    """
+    Ставит создание миниатюры в очередь. В синхронном режиме
+    (THUMBNAIL_GENERATE_ASYNC = False) создаёт её сразу и возвращает.
+    """
+    if not getattr(settings, 'THUMBNAIL_GENERATE_ASYNC', True):
+        try:
+            return get_thumbnail(file_, geometry, **options)
+        except Exception:
+            logger.exception('Не удалось создать миниатюру для %s', file_)
+            return None
+    with _executor_lock:
+        if key in _pending:
+            return None
+        _pending.add(key)
+        executor = _get_executor()
+    executor.submit(_generate, file_, geometry, options, key)
+    return None
+
+
+def resolve_thumbnails(objects, geometry, field='image', **options):
+    """
+    Находит миниатюры для всех объектов страницы одним запросом к
+    KV-хранилищу sorl и сохраняет их в атрибут ``thumbnail`` объекта.
+    Отсутствующие миниатюры создаются в фоне, а до тех пор
+    атрибут равен None.
+    """
+    wanted = {}
+    for obj in objects:
+        obj.thumbnail = None
+        file_ = getattr(obj, field)
+        if not file_:
+            continue
+        try:
+            thumbnail = _thumbnail_file(ImageFile(file_), geometry, options)
+        except Exception:
+            logger.exception('Не удалось вычислить миниатюру для %s', file_)
+            continue
+        key = add_prefix(thumbnail.key)
+        wanted.setdefault(key, []).append(obj)
+    if not wanted:
+        return
+    values = get_many_raw(list(wanted))
+    for key, related in wanted.items():
+        value = values.get(key)
+        if value is not None:
+            thumbnail = deserialize_image_file(value)
+        else:
+            file_ = getattr(related[0], field)
+            thumbnail = _schedule(file_, geometry, options, key)
+        for obj in related:
+            obj.thumbnail = thumbnail
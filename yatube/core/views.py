@@ -1,5 +1,21 @@
+import math
+import os
+import re
 from http import HTTPStatus
+
+from django.conf import settings
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views import static
+
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+
+PRECOMPRESSED = (
+    ('br', '.br'),
+    ('gzip', '.gz'),
+)
 
 
 def page_not_found(request, exception):
@@ -27,9 +43,78 @@ def permission_denied(request, exception):
     )
 
 
+def too_many_requests(request, retry_after):
+    response = render(
+        request,
+        'core/429.html',
+        status=HTTPStatus.TOO_MANY_REQUESTS,
+    )
+    response['Retry-After'] = str(math.ceil(retry_after))
+    return response
+
+
 def csrf_failure(request, reason=''):
     return render(
         request,
         'core/403csrf.html',
         status=HTTPStatus.FORBIDDEN,
     )
+
+
+def accepted_encodings(header):
+    """
+    Кодировки из PRECOMPRESSED, которые разрешает заголовок
+    Accept-Encoding, по убыванию q. Кодировки с q=0 запрещены, а *
+    относится ко всем, что не перечислены явно.
+    """
+    weights = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[coding] = quality
+    wildcard = weights.pop('*', 0.0)
+    accepted = [
+        (weights.get(encoding, wildcard), encoding, suffix)
+        for encoding, suffix in PRECOMPRESSED
+    ]
+    return [
+        (encoding, suffix)
+        for quality, encoding, suffix in sorted(
+            accepted, key=lambda item: -item[0]
+        )
+        if quality > 0
+    ]
+
+
+def serve_static(request, path):
+    """
+    Отдаёт файлы из STATIC_ROOT. Если клиент поддерживает сжатие и рядом
+    лежит сжатая копия, отдаёт её. Файлы с хешем в имени кешируются
+    клиентом на год.
+    """
+    served_path = path
+    for _, suffix in accepted_encodings(
+        request.META.get('HTTP_ACCEPT_ENCODING', '')
+    ):
+        if os.path.isfile(os.path.join(settings.STATIC_ROOT, path + suffix)):
+            served_path = path + suffix
+            break
+    response = static.serve(
+        request, served_path, document_root=settings.STATIC_ROOT
+    )
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if HASHED_NAME.search(path):
+        patch_cache_control(
+            response, public=True, max_age=STATIC_MAX_AGE, immutable=True
+        )
+    return response
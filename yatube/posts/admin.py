@@ -1,6 +1,85 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db.models.functions import Substr
+from django.urls import reverse
+from django.utils.html import format_html
 
-from .models import Group, Post
+from core.pagination import EstimatedCountPaginator
+
+from .groups import attach_stats
+from .models import Comment, Follow, Group, ModerationJob, Post
+from .moderation import start_job
+
+
+def start_moderation(modeladmin, request, kind, **params):
+    """Запускает фоновую задачу и показывает ссылку на её прогресс."""
+    job = start_job(kind, created_by=request.user, **params)
+    url = reverse('admin:posts_moderationjob_change', args=[job.pk])
+    modeladmin.message_user(
+        request,
+        format_html('Задача <a href="{}">{}</a> запущена.', url, job),
+        messages.SUCCESS,
+    )
+
+
+class PostActionForm(ActionForm):
+    group = forms.ModelChoiceField(
+        Group.objects.all(), required=False, label='Группа'
+    )
+
+
+class GroupAutocompleteSelect(AutocompleteSelect):
+    """
+    Автодополнение группы. Если виджету передана уже загруженная
+    группа (selected), её подпись не запрашивается из базы: в списке
+    постов виджет рисуется на каждой строке.
+    """
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        selected = self.selected
+        if selected is None or [str(item) for item in value if item] != [
+            str(selected.pk)
+        ]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name,
+            selected.pk,
+            self.choices.field.label_from_instance(selected),
+            True,
+            len(options),
+        ))
+        return [(None, options, 0)]
+
+
+class PostChangeListForm(forms.ModelForm):
+    """Форма строки списка постов: группа берётся из select_related."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        field = self.fields.get('group')
+        if field is None or not Post.group.field.is_cached(self.instance):
+            return
+        widget = getattr(field.widget, 'widget', field.widget)
+        if isinstance(widget, GroupAutocompleteSelect):
+            widget.selected = self.instance.group
+
+
+class PostChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # Аннотация добавляется только к выборке страницы, чтобы COUNT(*)
+        # и запросы date_hierarchy не оборачивались в подзапрос.
+        length = self.model_admin.text_preview_length
+        self.result_list = self.result_list.defer('text').annotate(
+            text_preview=Substr('text', 1, length)
+        )
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -12,9 +91,166 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    action_form = PostActionForm
+    actions = ('delete_authors_posts', 'move_to_group')
+
+    text_preview_length = 80
+
+    def get_list_display(self, request):
+        # В списке показываем начало текста, обрезанное в базе:
+        # полный текст каждой строки не читается.
+        return [
+            'short_text' if field == 'text' else field
+            for field in super().get_list_display(request)
+        ]
+
+    def get_changelist(self, request, **kwargs):
+        return PostChangeList
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', PostChangeListForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'group':
+            kwargs['widget'] = GroupAutocompleteSelect(
+                db_field.remote_field,
+                self.admin_site,
+                using=kwargs.get('using'),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def short_text(self, obj):
+        text = obj.text_preview
+        if len(text) == self.text_preview_length:
+            text += '…'
+        return text
+    short_text.short_description = 'Текст поста'
+    short_text.admin_order_field = 'text'
+
+    def delete_authors_posts(self, request, queryset):
+        author_ids = sorted(
+            set(queryset.values_list('author_id', flat=True))
+        )
+        start_moderation(
+            self, request, ModerationJob.DELETE_POSTS, author_ids=author_ids
+        )
+    delete_authors_posts.short_description = (
+        'Удалить все посты авторов выбранных постов'
+    )
+
+    def move_to_group(self, request, queryset):
+        field = PostActionForm.base_fields['group']
+        try:
+            group = field.clean(request.POST.get('group'))
+        except forms.ValidationError:
+            group = None
+        if group is None:
+            self.message_user(
+                request, 'Выберите группу для переноса.', messages.WARNING
+            )
+            return
+        start_moderation(
+            self,
+            request,
+            ModerationJob.MOVE_POSTS,
+            post_ids=list(queryset.values_list('pk', flat=True)),
+            group_id=group.pk,
+        )
+    move_to_group.short_description = 'Перенести выбранные посты в группу'
+
+
+class CommentAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'text',
+        'pub_date',
+        'author',
+        'post',
+    )
+    list_select_related = ('author', 'post')
+    raw_id_fields = ('author', 'post')
+    search_fields = ('text', 'author__username')
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('purge_authors',)
+
+    def purge_authors(self, request, queryset):
+        user_ids = sorted(set(queryset.values_list('author_id', flat=True)))
+        start_moderation(
+            self, request, ModerationJob.PURGE_USERS, user_ids=user_ids
+        )
+    purge_authors.short_description = (
+        'Удалить все комментарии и подписки авторов'
+    )
+
+
+class FollowAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'user',
+        'author',
+    )
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('purge_users',)
+
+    def purge_users(self, request, queryset):
+        user_ids = sorted(set(queryset.values_list('user_id', flat=True)))
+        start_moderation(
+            self, request, ModerationJob.PURGE_USERS, user_ids=user_ids
+        )
+    purge_users.short_description = (
+        'Удалить все комментарии и подписки подписчиков'
+    )
+
+
+class ModerationJobAdmin(admin.ModelAdmin):
+    list_display = (
+        '__str__',
+        'status',
+        'progress',
+        'created_by',
+        'created',
+        'finished',
+    )
+    list_select_related = ('created_by',)
+    list_filter = ('status', 'kind')
+    readonly_fields = (
+        'kind',
+        'params',
+        'created_by',
+        'status',
+        'progress',
+        'error',
+        'created',
+        'updated',
+        'finished',
+    )
+    fields = readonly_fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def progress(self, obj):
+        if not obj.total:
+            return f'{obj.processed}'
+        return f'{obj.processed} из {obj.total}'
+    progress.short_description = 'Прогресс'
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -23,10 +259,37 @@ class GroupAdmin(admin.ModelAdmin):
         'title',
         'slug',
         'description',
+        'posts_count',
+        'posters_count',
+        'last_post_at',
     )
+    list_select_related = ('stats',)
     search_fields = ('title',)
     empty_value_display = '-пусто-'
 
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        attach_stats(changelist.result_list)
+        return changelist
+
+    def posts_count(self, obj):
+        return obj.stats.posts_count
+    posts_count.short_description = 'Записей'
+    posts_count.admin_order_field = 'stats__posts_count'
+
+    def posters_count(self, obj):
+        return obj.stats.posters_count
+    posters_count.short_description = 'Авторов'
+    posters_count.admin_order_field = 'stats__posters_count'
+
+    def last_post_at(self, obj):
+        return obj.stats.last_post_at
+    last_post_at.short_description = 'Последняя запись'
+    last_post_at.admin_order_field = 'stats__last_post_at'
+
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
+admin.site.register(ModerationJob, ModerationJobAdmin)
@@ -0,0 +1,282 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files import locks
+from django.db import connection, models, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Post, User
+
+logger = logging.getLogger(__name__)
+
+QUEUE_NAME = 'comments.jsonl'
+LOCK_NAME = 'comments.lock'
+BATCH_PREFIX = 'batch-'
+BATCH_SIZE = 500
+PENDING_KEY = 'pending_comments'
+PENDING_LIMIT = 20
+# Столько комментариев в одном UPDATE даты: у каждого два параметра в
+# CASE и один в IN, а у SQLite есть лимит на число параметров запроса.
+PUB_DATE_CHUNK = 300
+
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def is_enabled():
+    return getattr(settings, 'COMMENTS_WRITE_BEHIND', False)
+
+
+def _queue_dir():
+    directory = getattr(
+        settings,
+        'COMMENT_QUEUE_DIR',
+        os.path.join(settings.BASE_DIR, 'comment_queue'),
+    )
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+@contextmanager
+def _locked(directory):
+    # Блокировка отдельного файла общая для всех процессов: запись в
+    # очередь и её переименование при сбросе не пересекаются.
+    with open(os.path.join(directory, LOCK_NAME), 'ab') as lock_file:
+        locks.lock(lock_file, locks.LOCK_EX)
+        try:
+            yield
+        finally:
+            locks.unlock(lock_file)
+
+
+def enqueue(post_id, author_id, text):
+    """
+    Дописывает комментарий в файл очереди и сбрасывает файл на диск.
+    Возвращает запись очереди; в базу её запишет flush().
+    """
+    entry = {
+        'queue_id': uuid.uuid4().hex,
+        'post': post_id,
+        'author': author_id,
+        'text': text,
+        'queued': timezone.now().isoformat(),
+    }
+    line = json.dumps(entry, ensure_ascii=False) + '\n'
+    directory = _queue_dir()
+    with _locked(directory):
+        path = os.path.join(directory, QUEUE_NAME)
+        with open(path, 'a', encoding='utf-8') as queue:
+            queue.write(line)
+            queue.flush()
+            os.fsync(queue.fileno())
+    _ensure_flusher()
+    return entry
+
+
+def _read(path):
+    entries = []
+    with open(path, encoding='utf-8') as batch:
+        for line in batch:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # Недописанная строка после аварийной остановки.
+                logger.warning('Пропущена повреждённая строка в %s', path)
+    return entries
+
+
+def _restore_pub_dates(comments):
+    # bulk_create проставляет auto_now_add временем записи, а датой
+    # комментария должно быть время, когда его отправили.
+    for start in range(0, len(comments), PUB_DATE_CHUNK):
+        chunk = comments[start:start + PUB_DATE_CHUNK]
+        Comment.objects.filter(
+            queue_id__in=[comment.queue_id for comment in chunk]
+        ).update(pub_date=Case(
+            *(
+                When(queue_id=comment.queue_id, then=Value(comment.queued))
+                for comment in chunk
+            ),
+            output_field=models.DateTimeField(),
+        ))
+
+
+def _save(entries):
+    """
+    Записывает порцию комментариев одним bulk_create. Сигналы post_save
+    при этом не посылаются: обработчиков у Comment нет, а лента
+    популярного и уведомления находят новые комментарии по таблице.
+    Кто добавит обработчик сохранения комментария, должен учесть эту
+    запись отдельно.
+    """
+    post_ids = set(
+        Post.objects.filter(pk__in={entry['post'] for entry in entries})
+        .values_list('pk', flat=True)
+    )
+    author_ids = set(
+        User.objects.filter(pk__in={entry['author'] for entry in entries})
+        .values_list('pk', flat=True)
+    )
+    # Комментарии к постам и от пользователей, удалённым за время
+    # ожидания, отбрасываются.
+    comments = []
+    for entry in entries:
+        if entry['post'] in post_ids and entry['author'] in author_ids:
+            comment = Comment(
+                queue_id=entry['queue_id'],
+                post_id=entry['post'],
+                author_id=entry['author'],
+                text=entry['text'],
+            )
+            comment.queued = parse_datetime(entry['queued'])
+            comments.append(comment)
+    with transaction.atomic():
+        Comment.objects.bulk_create(comments, ignore_conflicts=True)
+        _restore_pub_dates(comments)
+    return len(comments)
+
+
+def _flush_batch(path, batch_size):
+    try:
+        entries = _read(path)
+    except FileNotFoundError:
+        # Порцию уже записал другой процесс.
+        return 0
+    saved = 0
+    for start in range(0, len(entries), batch_size):
+        saved += _save(entries[start:start + batch_size])
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    return saved
+
+
+def flush(batch_size=BATCH_SIZE):
+    """
+    Записывает накопленные комментарии в базу через bulk_create по
+    batch_size штук в транзакции. Очередь под блокировкой
+    переименовывается в файл порции, и новые комментарии пишутся уже
+    в новый файл. Порция удаляется после записи, а оставшиеся после
+    сбоя порции записываются повторно без дубликатов по queue_id.
+    """
+    directory = _queue_dir()
+    with _locked(directory):
+        path = os.path.join(directory, QUEUE_NAME)
+        if os.path.exists(path) and os.path.getsize(path):
+            os.rename(path, os.path.join(
+                directory,
+                f'{BATCH_PREFIX}{time.time_ns()}-{uuid.uuid4().hex[:8]}.jsonl',
+            ))
+    saved = 0
+    for name in sorted(os.listdir(directory)):
+        if name.startswith(BATCH_PREFIX):
+            saved += _flush_batch(os.path.join(directory, name), batch_size)
+    return saved
+
+
+def queued_ids():
+    """queue_id комментариев, которые ещё не записаны в базу."""
+    directory = _queue_dir()
+    ids = set()
+    # Под блокировкой очередь не дописывают и не переименовывают.
+    with _locked(directory):
+        names = [QUEUE_NAME] + [
+            name for name in os.listdir(directory)
+            if name.startswith(BATCH_PREFIX)
+        ]
+        for name in names:
+            try:
+                entries = _read(os.path.join(directory, name))
+            except FileNotFoundError:
+                continue
+            ids.update(entry.get('queue_id') for entry in entries)
+    return ids
+
+
+def _flush_forever(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            flush()
+        except Exception:
+            logger.exception('Не удалось записать комментарии из очереди')
+        finally:
+            connection.close()
+
+
+def _ensure_flusher():
+    """
+    Запускает в процессе поток, который сбрасывает очередь каждые
+    COMMENT_FLUSH_INTERVAL секунд. При 0 очередь сбрасывает только
+    команда flush_comments.
+    """
+    global _flusher
+    interval = getattr(settings, 'COMMENT_FLUSH_INTERVAL', 1)
+    if not interval:
+        return
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(
+                target=_flush_forever,
+                args=(interval,),
+                name='comment-flusher',
+                daemon=True,
+            )
+            _flusher.start()
+
+
+def remember(session, entry):
+    """Запоминает в сессии комментарий автора, ожидающий записи."""
+    pending = session.get(PENDING_KEY, [])
+    pending.append({
+        'queue_id': entry['queue_id'],
+        'post': entry['post'],
+        'text': entry['text'],
+    })
+    session[PENDING_KEY] = pending[-PENDING_LIMIT:]
+
+
+def pending_comments(request, post, comments):
+    """
+    Ещё не записанные комментарии пользователя к посту как несохранённые
+    объекты Comment. В сессии остаются только комментарии, которые ещё
+    лежат в очереди: записанные и отброшенные при сбросе убираются.
+    """
+    if not request.user.is_authenticated:
+        return []
+    pending = request.session.get(PENDING_KEY)
+    if not pending:
+        return []
+    shown = {comment.queue_id for comment in comments if comment.queue_id}
+    left = [entry for entry in pending if entry['queue_id'] not in shown]
+    queued = queued_ids() if left else set()
+    gone = [
+        entry['queue_id'] for entry in left
+        if entry['queue_id'] not in queued
+    ]
+    # Комментарий, записанный уже после выборки comments, показываем
+    # ещё раз, а отброшенный при сбросе нигде не найдётся.
+    saved = set()
+    if gone:
+        saved = set(
+            Comment.objects.filter(queue_id__in=gone)
+            .values_list('queue_id', flat=True)
+        )
+    remaining = [entry for entry in left if entry['queue_id'] in queued]
+    if len(remaining) != len(pending):
+        request.session[PENDING_KEY] = remaining
+    return [
+        Comment(post=post, author=request.user, text=entry['text'])
+        for entry in left
+        if entry['post'] == post.pk
+        and (entry['queue_id'] in queued or entry['queue_id'] in saved)
+    ]
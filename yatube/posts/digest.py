@@ -0,0 +1,62 @@
+from collections import defaultdict
+
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import render_to_string
+
+from .models import Follow, Post, User
+
+POSTS_LIMIT = 20
+
+
+def follow_digests(since, limit=POSTS_LIMIT):
+    """
+    Новые посты подписок с момента since для всех подписчиков с
+    адресом почты: {пользователь: [посты]}. Собирается тремя запросами
+    независимо от числа подписчиков и постов; у каждого подписчика
+    не больше limit самых новых постов.
+    """
+    by_author = defaultdict(list)
+    for post in (
+        Post.objects.filter(pub_date__gte=since)
+        .select_related('author')
+        .order_by('-pub_date')
+    ):
+        by_author[post.author_id].append(post)
+    if not by_author:
+        return {}
+    posts_by_user = defaultdict(list)
+    follows = Follow.objects.filter(
+        author_id__in=by_author, user__isnull=False
+    ).exclude(user__email='')
+    for user_id, author_id in follows.values_list('user_id', 'author_id'):
+        posts_by_user[user_id].extend(by_author[author_id])
+    users = User.objects.in_bulk(list(posts_by_user))
+    return {
+        users[user_id]: sorted(
+            posts, key=lambda post: post.pub_date, reverse=True
+        )[:limit]
+        for user_id, posts in posts_by_user.items()
+    }
+
+
+def digest_messages(digests, base_url):
+    messages = []
+    for user, posts in digests.items():
+        context = {'user': user, 'posts': posts, 'base_url': base_url}
+        subject = render_to_string(
+            'posts/email/follow_digest_subject.txt', context
+        )
+        messages.append(EmailMessage(
+            ''.join(subject.splitlines()),
+            render_to_string('posts/email/follow_digest.txt', context),
+            to=[user.email],
+        ))
+    return messages
+
+
+def send_follow_digests(since, base_url):
+    """Отправляет по одному письму-сводке каждому подписчику."""
+    messages = digest_messages(follow_digests(since), base_url)
+    if messages:
+        get_connection().send_messages(messages)
+    return len(messages)
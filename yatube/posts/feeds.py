@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.template.loader import render_to_string
+
+from core.pagination import invalidate_counts
+from core.thumbnails import resolve_thumbnails
+
+from .follows import user_token
+
+# Ключи лент для кеша числа постов в CachedCountPaginator.
+INDEX_FEED = 'index'
+GROUP_INDEX = 'groups'
+
+# Миниатюры ленты, как в шаблонах {% resolve_thumbnails %}.
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+NEXT_PAGE_KEY = 'feed:next:{}:{}'
+NEXT_PAGE_TIMEOUT = 20
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def profile_feed(author_id):
+    return f'profile:{author_id}'
+
+
+def follow_feed(user):
+    return f'follow:{user_token(user)}'
+
+
+def invalidate(group_ids=(), author_ids=()):
+    """Сбрасывает число постов общей ленты и лент групп и авторов."""
+    invalidate_counts(
+        INDEX_FEED,
+        *(group_feed(pk) for pk in group_ids if pk is not None),
+        *(profile_feed(pk) for pk in author_ids),
+    )
+
+
+def next_page_thumbnails(feed, number):
+    """Адреса миниатюр страницы number, если она уже прогрета."""
+    return cache.get(NEXT_PAGE_KEY.format(feed, number))
+
+
+def warm_page(feed, page, fragment=None):
+    """
+    Прогревает страницу ленты: выбирает посты, ставит в очередь
+    недостающие миниатюры и запоминает их адреса для заголовка Link.
+    fragment — пара (имя фрагмента, шаблон) для страниц, закешированных
+    тегом {% cache ... имя page_obj.number %}: такой шаблон рендерится,
+    если фрагмента ещё нет в кеше.
+    """
+    posts = list(page.object_list)
+    resolve_thumbnails(posts, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+    cache.set(
+        NEXT_PAGE_KEY.format(feed, page.number),
+        [post.thumbnail.url for post in posts if post.thumbnail],
+        NEXT_PAGE_TIMEOUT,
+    )
+    if fragment is not None:
+        name, template = fragment
+        if cache.get(make_template_fragment_key(name, [page.number])) is None:
+            page.object_list = posts
+            render_to_string(template, {'page_obj': page})
@@ -0,0 +1,145 @@
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+
+from .models import Follow
+
+FOLLOWING_KEY = 'follow:following:{}'
+FOLLOWERS_KEY = 'follow:followers:{}'
+FOLLOWER_COUNT_KEY = 'follow:follower_count:{}'
+FOLLOW_CACHE_TIMEOUT = 60 * 60
+
+# Больше идентификаторов не подставляем в IN (у SQLite есть лимит
+# на число параметров запроса), вместо этого используем JOIN.
+MAX_IN_IDS = 500
+
+
+def _cache():
+    return caches[getattr(settings, 'FOLLOW_CACHE_ALIAS', 'shared')]
+
+
+def user_token(user):
+    """
+    Ключ пользователя в кеше. Кроме id содержит время регистрации:
+    id удалённого пользователя может достаться новому, и тогда он
+    не должен получить чужие подписки из кеша.
+    """
+    return f'{user.pk}.{user.date_joined.timestamp():.6f}'
+
+
+def _sorted_ids(queryset, field):
+    return array('q', queryset.order_by(field).values_list(field, flat=True))
+
+
+def _contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def following_ids(user):
+    """Отсортированный массив id авторов, на которых подписан user."""
+    key = FOLLOWING_KEY.format(user_token(user))
+    ids = _cache().get(key)
+    if ids is None:
+        ids = _sorted_ids(Follow.objects.filter(user=user), 'author_id')
+        _cache().set(key, ids, FOLLOW_CACHE_TIMEOUT)
+    return ids
+
+
+def follower_ids(author):
+    """Отсортированный массив id подписчиков author."""
+    key = FOLLOWERS_KEY.format(user_token(author))
+    ids = _cache().get(key)
+    if ids is None:
+        ids = _sorted_ids(Follow.objects.filter(author=author), 'user_id')
+        _cache().set(key, ids, FOLLOW_CACHE_TIMEOUT)
+    return ids
+
+
+def is_following(user, author):
+    if not user.is_authenticated:
+        return False
+    return _contains(following_ids(user), author.pk)
+
+
+def is_following_many(user, author_ids):
+    """Словарь {id автора: подписан ли user} для кнопок на странице."""
+    if not user.is_authenticated:
+        return dict.fromkeys(author_ids, False)
+    ids = following_ids(user)
+    return {author_id: _contains(ids, author_id) for author_id in author_ids}
+
+
+def mutuals(user):
+    """id пользователей, с которыми user подписан взаимно."""
+    followers = follower_ids(user)
+    return [
+        author_id for author_id in following_ids(user)
+        if _contains(followers, author_id)
+    ]
+
+
+def follower_count(author):
+    """
+    Число подписчиков author. Запись его не меняет, а сбрасывает:
+    инкремент по месту при промахе и гонке с чтением мог бы разойтись
+    с базой на всё время жизни записи.
+    """
+    key = FOLLOWER_COUNT_KEY.format(user_token(author))
+    count = _cache().get(key)
+    if count is None:
+        count = Follow.objects.filter(author=author).count()
+        _cache().add(key, count, FOLLOW_CACHE_TIMEOUT)
+    return count
+
+
+def followed_posts_filter(user):
+    """Условие для ленты подписок без JOIN с таблицей Follow."""
+    ids = following_ids(user)
+    if len(ids) > MAX_IN_IDS:
+        return {'author__following__user': user}
+    return {'author_id__in': list(ids)}
+
+
+def follow(user, author):
+    """
+    Подписывает user на author одним INSERT. Повторная подписка
+    отклоняется уникальным ограничением. Возвращает True, если
+    подписка создана.
+    """
+    if user.pk == author.pk:
+        return False
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user=user, author=author)
+    except IntegrityError:
+        return False
+    invalidate(user, [author])
+    return True
+
+
+def unfollow(user, author):
+    """Отписывает user от author одним DELETE."""
+    deleted, _ = Follow.objects.filter(user=user, author=author).delete()
+    if deleted:
+        invalidate(user, [author])
+    return bool(deleted)
+
+
+def invalidate(user, authors):
+    """
+    Сбрасывает кеш подписок user и подписчиков authors. Записи не
+    правятся по месту, а удаляются: сразу и ещё раз после коммита
+    транзакции, потому что другой процесс мог между ними прочитать из
+    базы и закешировать старое состояние.
+    """
+    keys = [FOLLOWING_KEY.format(user_token(user))]
+    for author in authors:
+        token = user_token(author)
+        keys.append(FOLLOWERS_KEY.format(token))
+        keys.append(FOLLOWER_COUNT_KEY.format(token))
+    _cache().delete_many(keys)
+    transaction.on_commit(lambda: _cache().delete_many(keys))
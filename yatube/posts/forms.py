@@ -1,6 +1,10 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 from django.utils.translation import gettext_lazy as _
 
+from core.storage import file_hash
+
+from .images import normalize_image, validate_image
 from .models import Comment, Post
 
 
@@ -25,6 +29,29 @@ class PostForm(forms.ModelForm):
             raise forms.ValidationError('Нужно заполнить поле.')
         return data
 
+    def clean_image(self):
+        data = self.cleaned_data['image']
+        if not isinstance(data, UploadedFile):
+            return data
+        validate_image(data)
+        data = normalize_image(data)
+        self.image_hash = data.content_hash = file_hash(data)
+        return data
+
+    def save(self, commit=True):
+        post = super().save(commit=False)
+        image_hash = getattr(self, 'image_hash', None)
+        if image_hash:
+            # Такую же картинку хранилище повторно не сохраняет: под
+            # блокировкой оно вернёт имя существующего файла.
+            post.image_hash = image_hash
+        elif not post.image:
+            post.image_hash = ''
+        if commit:
+            post.save()
+            self._save_m2m()
+        return post
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
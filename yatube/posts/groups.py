@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Max, OuterRef, Subquery, When
+from django.db.models.functions import Greatest
+from django.shortcuts import get_object_or_404
+
+from .models import Group, GroupStats, Post
+
+GROUP_KEY = 'group:slug:{}'
+GROUP_CACHE_TIMEOUT = 60 * 60
+
+
+def _cache():
+    return caches[getattr(settings, 'GROUP_CACHE_ALIAS', 'shared')]
+
+
+def get_group_or_404(slug):
+    """
+    Группа по slug из общего кеша процессов; сбрасывается сигналами
+    при изменении.
+    """
+    key = GROUP_KEY.format(slug)
+    group = _cache().get(key)
+    if group is None:
+        group = get_object_or_404(Group, slug=slug)
+        _cache().set(key, group, GROUP_CACHE_TIMEOUT)
+    return group
+
+
+def invalidate(*slugs):
+    """
+    Сбрасывает группы сразу и ещё раз после коммита, чтобы не осталась
+    версия, прочитанная другим процессом до него.
+    """
+    keys = [GROUP_KEY.format(slug) for slug in slugs if slug]
+    _cache().delete_many(keys)
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def refresh_stats(group_ids):
+    """
+    Пересчитывает статистику групп агрегатом по постам. Нужна для
+    групп без строки статистики и после bulk_create, который не
+    посылает сигналов.
+    """
+    totals = {
+        row['group_id']: row
+        for row in Post.objects.filter(group_id__in=group_ids)
+        .values('group_id')
+        .annotate(
+            count=Count('pk'),
+            posters=Count('author', distinct=True),
+            last=Max('pub_date'),
+        )
+        .order_by()
+    }
+    empty = {'count': 0, 'posters': 0, 'last': None}
+    rows = [
+        GroupStats(
+            group_id=group_id,
+            posts_count=totals.get(group_id, empty)['count'],
+            posters_count=totals.get(group_id, empty)['posters'],
+            last_post_at=totals.get(group_id, empty)['last'],
+        )
+        for group_id in Group.objects.filter(pk__in=group_ids)
+        .values_list('pk', flat=True)
+    ]
+    with transaction.atomic():
+        GroupStats.objects.filter(group_id__in=group_ids).delete()
+        GroupStats.objects.bulk_create(rows)
+    return {row.group_id: row for row in rows}
+
+
+def group_stats(group):
+    try:
+        return GroupStats.objects.get(group=group)
+    except GroupStats.DoesNotExist:
+        return refresh_stats([group.pk]).get(group.pk)
+
+
+def attach_stats(groups):
+    """
+    Заполняет group.stats для групп, выбранных с select_related('stats'):
+    недостающие строки статистики создаются одним пересчётом.
+    """
+    missing = [
+        group.pk for group in groups if not hasattr(group, 'stats')
+    ]
+    created = refresh_stats(missing) if missing else {}
+    for group in groups:
+        if group.pk in created:
+            group.stats = created[group.pk]
+    return groups
+
+
+def _has_other_posts(group_id, author_id, post_id):
+    # Проверка идёт по индексу (group, author).
+    return (
+        Post.objects.filter(group_id=group_id, author_id=author_id)
+        .exclude(pk=post_id)
+        .exists()
+    )
+
+
+def post_added(group_id, author_id, post_id, pub_date):
+    """Учитывает новый пост группы: проверка автора и один UPDATE."""
+    new_poster = 0 if _has_other_posts(group_id, author_id, post_id) else 1
+    updated = GroupStats.objects.filter(group_id=group_id).update(
+        posts_count=F('posts_count') + 1,
+        posters_count=F('posters_count') + new_poster,
+        last_post_at=Case(
+            When(last_post_at__gte=pub_date, then=F('last_post_at')),
+            default=pub_date,
+            output_field=models.DateTimeField(),
+        ),
+    )
+    if not updated:
+        refresh_stats([group_id])
+
+
+def post_removed(group_id, author_id, post_id):
+    """Учитывает удаление поста группы: проверка автора и один UPDATE."""
+    gone = 0 if _has_other_posts(group_id, author_id, post_id) else 1
+    latest = (
+        Post.objects.filter(group_id=OuterRef('group_id'))
+        .order_by('-pub_date')
+        .values('pub_date')[:1]
+    )
+    GroupStats.objects.filter(group_id=group_id).update(
+        posts_count=Greatest(F('posts_count') - 1, 0),
+        posters_count=Greatest(F('posters_count') - gone, 0),
+        last_post_at=Subquery(latest),
+    )
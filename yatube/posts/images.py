@@ -0,0 +1,126 @@
+import logging
+import os
+from contextlib import nullcontext
+from io import BytesIO
+
+from django import forms
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_DIMENSION = 10000
+IMAGE_MAX_SIDE = 1920
+IMAGE_ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+IMAGE_JPEG_QUALITY = 85
+# Файл, который моложе этого числа секунд, release_image не удаляет:
+# его могли только что переиспользовать для поста, ещё не сохранённого
+# в базе. Такие файлы позже удаляет команда collect_orphaned_media.
+IMAGE_RELEASE_GRACE = 10 * 60
+
+EXTENSIONS = {
+    'JPEG': '.jpg',
+    'PNG': '.png',
+    'GIF': '.gif',
+    'WEBP': '.webp',
+}
+
+
+def validate_image(file_):
+    """
+    Проверяет размер файла, формат и разрешение картинки.
+    Формат и разрешение берутся из заголовка, который уже прочитал
+    forms.ImageField, поэтому картинка здесь не декодируется.
+    """
+    if file_.size > IMAGE_MAX_UPLOAD_SIZE:
+        raise forms.ValidationError(
+            'Размер файла не должен превышать %(size)s МБ.',
+            params={'size': IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)},
+        )
+    image = file_.image
+    if image.format not in IMAGE_ALLOWED_FORMATS:
+        raise forms.ValidationError('Неподдерживаемый формат изображения.')
+    width, height = image.size
+    if max(width, height) > IMAGE_MAX_DIMENSION:
+        raise forms.ValidationError(
+            'Разрешение изображения не должно превышать %(max)sx%(max)s.',
+            params={'max': IMAGE_MAX_DIMENSION},
+        )
+
+
+def _needs_processing(image):
+    if image.format == 'GIF':
+        # Анимацию не пережимаем, чтобы не потерять кадры.
+        return False
+    return max(image.size) > IMAGE_MAX_SIDE or 'exif' in image.info
+
+
+def normalize_image(file_):
+    """
+    Приводит загруженную картинку к виду для хранения: поворачивает по
+    EXIF, удаляет метаданные и уменьшает до IMAGE_MAX_SIDE по большей
+    стороне. Если менять нечего, возвращает исходный файл.
+    """
+    header = file_.image
+    if not _needs_processing(header):
+        return file_
+    file_.seek(0)
+    with Image.open(file_) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE), Image.LANCZOS)
+        if header.format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        options = {'format': header.format}
+        if header.format == 'JPEG':
+            options.update(quality=IMAGE_JPEG_QUALITY, optimize=True)
+        buffer = BytesIO()
+        image.save(buffer, **options)
+    name = os.path.splitext(file_.name)[0] + EXTENSIONS[header.format]
+    processed = ContentFile(buffer.getvalue(), name=name)
+    processed.image = header
+    processed.content_type = getattr(file_, 'content_type', None)
+    return processed
+
+
+def _recently_used(storage, name, grace):
+    try:
+        modified = storage.get_modified_time(name)
+    except FileNotFoundError:
+        return False
+    return (timezone.now() - modified).total_seconds() < grace
+
+
+def release_image(name, storage=None, grace=None):
+    """
+    Удаляет файл картинки вместе с миниатюрами, если ни один пост
+    больше на него не ссылается и файл старше grace секунд (по
+    умолчанию IMAGE_RELEASE_GRACE). Проверка и удаление идут под
+    блокировкой хранилища, а сохранение такого же файла под ней же
+    обновляет время его изменения. Возвращает True, если файл удалён.
+    """
+    if not name:
+        return False
+    storage = storage or Post._meta.get_field('image').storage
+    grace = IMAGE_RELEASE_GRACE if grace is None else grace
+    try:
+        if not storage.exists(name):
+            return False
+        with getattr(storage, 'locked', nullcontext)():
+            if (
+                _recently_used(storage, name, grace)
+                or Post.objects.filter(image=name).exists()
+            ):
+                return False
+            default.kvstore.delete(ImageFile(name, storage))
+            storage.delete(name)
+    except (OSError, SuspiciousFileOperation):
+        logger.exception('Не удалось удалить картинку %s', name)
+        return False
+    return True
@@ -0,0 +1,91 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts.models import Comment, Post, TrendingPost, User
+from posts.trending import update_trending
+
+BULK_BATCH_SIZE = 500
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время пересчёта ленты популярного на синтетических '
+        'данных. Все созданные записи откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument(
+            '--increment',
+            type=int,
+            default=1000,
+            help='Сколько комментариев добавить перед повторным пересчётом.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        now = timezone.now()
+        User.objects.bulk_create(
+            User(username=f'trending-benchmark-{i}')
+            for i in range(options['users'])
+        )
+        users = list(User.objects.filter(
+            username__startswith='trending-benchmark-'
+        ))
+        Post.objects.bulk_create(
+            (
+                Post(author=random.choice(users), text='benchmark')
+                for _ in range(options['posts'])
+            ),
+            batch_size=BULK_BATCH_SIZE,
+        )
+        post_ids = list(
+            Post.objects.filter(author__in=users).values_list('pk', flat=True)
+        )
+        TrendingPost.objects.all().delete()
+        self.comment(users, post_ids, options['comments'])
+        self.measure('Полный пересчёт', full=True, now=now)
+        self.comment(users, post_ids, options['increment'])
+        self.measure('Инкрементальный пересчёт', now=now)
+        self.measure(
+            'Пересчёт без изменений', now=now + timedelta(seconds=1)
+        )
+
+    def comment(self, users, post_ids, count):
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    post_id=random.choice(post_ids),
+                    author=random.choice(users),
+                    text='benchmark',
+                )
+                for _ in range(count)
+            ),
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+    def measure(self, title, **kwargs):
+        started = time.monotonic()
+        total = update_trending(**kwargs)
+        self.stdout.write(
+            f'{title}: постов {total}, '
+            f'{time.monotonic() - started:.2f} с'
+        )
@@ -0,0 +1,156 @@
+import os
+import re
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from core.thumbnails import get_many_raw
+from posts.models import Post
+
+BATCH_SIZE = 500
+
+# Миниатюры для THUMBNAIL_ALTERNATIVE_RESOLUTIONS не имеют своего ключа.
+RESOLUTION_SUFFIX = re.compile(r'@[\d.]+x(?=\.\w+$)')
+
+
+def walk_files(root, directory):
+    """
+    Обходит файлы каталога рекурсивно, не собирая их в список.
+    Возвращает пары (имя относительно root, os.DirEntry).
+    """
+    top = os.path.join(root, directory)
+    if not os.path.isdir(top):
+        return
+    stack = [top]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = os.path.relpath(entry.path, root)
+                    yield name.replace(os.sep, '/'), entry
+
+
+def batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из MEDIA_ROOT картинки, на которые не ссылается ни один '
+        'пост, и миниатюры, которых нет в хранилище sorl-thumbnail.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=24 * 60 * 60,
+            help='Не трогать файлы моложе указанного числа секунд.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что будет удалено.',
+        )
+        parser.add_argument(
+            '--every',
+            type=int,
+            default=0,
+            help='Повторять очистку каждые N секунд.',
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.verbosity = options['verbosity']
+        self.grace = options['grace']
+        self.storage = Post._meta.get_field('image').storage
+        self.upload_to = Post._meta.get_field('image').upload_to
+        while True:
+            self.collect()
+            if not options['every']:
+                break
+            time.sleep(options['every'])
+
+    def collect(self):
+        self.files = 0
+        self.reclaimed = 0
+        self.deadline = time.time() - self.grace
+        root = settings.MEDIA_ROOT
+        originals = walk_files(root, self.upload_to)
+        for batch in batches(self.old_files(originals), BATCH_SIZE):
+            self.collect_originals(batch)
+        thumbnails = walk_files(root, sorl_settings.THUMBNAIL_PREFIX)
+        for batch in batches(self.old_files(thumbnails), BATCH_SIZE):
+            self.collect_thumbnails(batch)
+        action = 'Будет освобождено' if self.dry_run else 'Освобождено'
+        self.stdout.write(
+            f'{action}: {self.reclaimed} байт, файлов: {self.files}'
+        )
+
+    def old_files(self, files):
+        for name, entry in files:
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime < self.deadline:
+                yield name, stat.st_size
+
+    def modified_since_scan(self, name):
+        try:
+            return os.stat(self.storage.path(name)).st_mtime >= self.deadline
+        except FileNotFoundError:
+            return True
+
+    def collect_originals(self, batch):
+        """
+        Как posts.images.release_image: ссылки и время изменения файлов
+        проверяются заново под блокировкой хранилища, ведь пока шёл
+        обход, такую же картинку могли загрузить снова.
+        """
+        with getattr(self.storage, 'locked', nullcontext)():
+            referenced = set(
+                Post.objects.filter(image__in=[name for name, _ in batch])
+                .values_list('image', flat=True)
+            )
+            for name, size in batch:
+                if name in referenced or self.modified_since_scan(name):
+                    continue
+                self.remove(name, size)
+                if not self.dry_run:
+                    # Вместе с ключом удаляются и миниатюры картинки.
+                    default.kvstore.delete(ImageFile(name, self.storage))
+                    self.storage.delete(name)
+
+    def collect_thumbnails(self, batch):
+        keys = [
+            add_prefix(
+                ImageFile(RESOLUTION_SUFFIX.sub('', name), default.storage).key
+            )
+            for name, _ in batch
+        ]
+        known = get_many_raw(keys)
+        for key, (name, size) in zip(keys, batch):
+            if known.get(key) is not None:
+                continue
+            self.remove(name, size)
+            if not self.dry_run:
+                default.storage.delete(name)
+
+    def remove(self, name, size):
+        self.files += 1
+        self.reclaimed += size
+        if self.dry_run or self.verbosity > 1:
+            self.stdout.write(name)
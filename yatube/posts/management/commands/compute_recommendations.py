@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import BATCH_SIZE, TOP_K, compute_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации «На кого подписаться».'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=TOP_K,
+            help='Сколько рекомендаций хранить для пользователя.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько пользователей записывать за одну транзакцию.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = compute_recommendations(
+            top_k=options['top_k'], batch_size=options['batch_size']
+        )
+        self.stdout.write(
+            f'Рекомендаций: {total}, '
+            f'время: {time.monotonic() - started:.1f} с'
+        )
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.notifications import BATCH_SIZE, fan_out
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт уведомления о новых комментариях и подписках. '
+        'Запускается по расписанию или с --every.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько событий обрабатывать за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--every',
+            type=float,
+            default=0,
+            help='Повторять рассылку каждые N секунд.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            total = fan_out(batch_size=options['batch_size'])
+            if total or options['verbosity'] > 1:
+                self.stdout.write(
+                    f'Обработано событий: {total}, '
+                    f'время: {time.monotonic() - started:.1f} с'
+                )
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.comment_queue import BATCH_SIZE, flush
+
+
+class Command(BaseCommand):
+    help = (
+        'Записывает в базу комментарии из очереди отложенной записи '
+        '(COMMENTS_WRITE_BEHIND).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько комментариев записывать за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--every',
+            type=float,
+            default=0,
+            help='Повторять запись каждые N секунд.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            saved = flush(batch_size=options['batch_size'])
+            if saved or options['verbosity'] > 1:
+                self.stdout.write(f'Записано комментариев: {saved}')
+            if not options['every']:
+                break
+            time.sleep(options['every'])
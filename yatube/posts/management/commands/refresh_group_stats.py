@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.groups import refresh_stats
+from posts.models import Group
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает статистику групп по постам. Нужна после массовой '
+        'загрузки постов через bulk_create, которая не посылает сигналов.'
+    )
+
+    def handle(self, *args, **options):
+        group_ids = list(
+            Group.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        for start in range(0, len(group_ids), BATCH_SIZE):
+            refresh_stats(group_ids[start:start + BATCH_SIZE])
+        self.stdout.write(f'Обновлено групп: {len(group_ids)}')
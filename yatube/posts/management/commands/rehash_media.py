@@ -0,0 +1,90 @@
+import os
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import File
+from django.core.management.base import BaseCommand
+
+from core.storage import file_hash, hashed_path
+from posts.images import release_image
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в хранилище с адресацией по содержимому '
+        'и удаляет освободившиеся файлы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько постов обрабатывать за один запрос.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что будет сделано.',
+        )
+
+    def handle(self, *args, **options):
+        self.storage = Post._meta.get_field('image').storage
+        self.dry_run = options['dry_run']
+        self.stats = {'moved': 0, 'skipped': 0, 'missing': 0, 'released': 0}
+        last_pk = 0
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .exclude(image='')
+                .order_by('pk')
+                .values_list('pk', 'image', 'image_hash')
+                [:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            renamed = {}
+            for pk, name, image_hash in batch:
+                if name not in renamed:
+                    renamed[name] = self.rehash(name, image_hash)
+        self.stdout.write(
+            'Перенесено: {moved}, без изменений: {skipped}, '
+            'не найдено: {missing}, удалено файлов: {released}'.format(
+                **self.stats
+            )
+        )
+
+    def rehash(self, name, image_hash):
+        stem = os.path.splitext(os.path.basename(name))[0]
+        if image_hash and stem == image_hash:
+            self.stats['skipped'] += 1
+            return name
+        try:
+            with self.storage.open(name) as source:
+                digest = file_hash(File(source))
+        except (OSError, SuspiciousFileOperation):
+            self.stderr.write(f'Файл не найден: {name}')
+            self.stats['missing'] += 1
+            return name
+        new_name = hashed_path(
+            os.path.dirname(name), digest, os.path.splitext(name)[1]
+        )
+        if self.dry_run:
+            self.stdout.write(f'{name} -> {new_name}')
+            self.stats['moved' if new_name != name else 'skipped'] += 1
+            return new_name
+        if new_name != name:
+            with self.storage.open(name) as source:
+                content = File(source, name=name)
+                content.content_hash = digest
+                new_name = self.storage.save(name, content)
+            self.stats['moved'] += 1
+        else:
+            self.stats['skipped'] += 1
+        Post.objects.filter(image=name).update(
+            image=new_name, image_hash=digest
+        )
+        if new_name != name and release_image(name, self.storage, grace=0):
+            self.stats['released'] += 1
+        return new_name
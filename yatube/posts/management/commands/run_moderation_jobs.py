@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts.moderation import JobBusy, run_job, runnable_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет задачи модерации, оставшиеся в очереди, и продолжает '
+        'зависшие в работе, например после перезапуска сервера.'
+    )
+
+    def handle(self, *args, **options):
+        job_ids = list(
+            runnable_jobs().order_by('pk').values_list('pk', flat=True)
+        )
+        done = 0
+        for job_id in job_ids:
+            try:
+                run_job(job_id)
+            except JobBusy:
+                # Задачу успел взять другой исполнитель.
+                continue
+            done += 1
+        self.stdout.write(f'Выполнено задач: {done}')
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.digest import send_follow_digests
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет подписчикам письмо-сводку с новыми постами авторов, '
+        'на которых они подписаны. Запускается по расписанию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='За сколько последних часов собирать посты.',
+        )
+        parser.add_argument(
+            '--base-url',
+            default='http://' + next(
+                (host for host in settings.ALLOWED_HOSTS if '*' not in host),
+                'localhost',
+            ),
+            help='Адрес сайта для ссылок в письмах.',
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options['hours'])
+        sent = send_follow_digests(since, options['base_url'].rstrip('/'))
+        self.stdout.write(f'Отправлено писем: {sent}')
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.trending import BATCH_SIZE, update_trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает оценки ленты популярного для постов с новыми '
+        'комментариями и удаляет посты, вышедшие из окна.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать все посты окна, а не только изменившиеся.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько постов записывать за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--every',
+            type=int,
+            default=0,
+            help='Повторять пересчёт каждые N секунд.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            total = update_trending(
+                full=options['full'], batch_size=options['batch_size']
+            )
+            self.stdout.write(
+                f'Пересчитано постов: {total}, '
+                f'время: {time.monotonic() - started:.1f} с'
+            )
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,187 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory
+from django.urls import reverse
+
+from posts.models import GroupStats, User
+
+
+class Throttle:
+    """Не даёт выполнять больше rate запросов в секунду на все потоки."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(self.next_slot, now) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогревает кеши популярных страниц: первые страницы главной, '
+        'самые большие группы и профили авторов с наибольшим числом '
+        'подписчиков. Страницы рендерятся параллельно в пуле потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--index-pages',
+            type=int,
+            default=3,
+            help='Сколько первых страниц главной прогреть.',
+        )
+        parser.add_argument(
+            '--groups',
+            type=int,
+            default=10,
+            help='Сколько групп с наибольшим числом постов прогреть.',
+        )
+        parser.add_argument(
+            '--authors',
+            type=int,
+            default=10,
+            help='Сколько профилей авторов с наибольшим числом '
+                 'подписчиков прогреть.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Число потоков; при 1 страницы запрашиваются по очереди.',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=0,
+            help='Не больше стольких запросов в секунду, 0 — без ограничения.',
+        )
+        parser.add_argument(
+            '--base-url',
+            default=getattr(
+                settings, 'WARM_CACHE_BASE_URL', 'http://localhost:8000'
+            ),
+            help='Адрес работающего сервера, у которого страницы '
+                 'запрашиваются по HTTP, по умолчанию WARM_CACHE_BASE_URL.',
+        )
+        parser.add_argument(
+            '--local',
+            action='store_true',
+            help='Рендерить страницы в этом процессе, а не запрашивать у '
+                 'сервера. Прогревает только общие кеши, но не '
+                 'LocMemCache процессов сервера.',
+        )
+        parser.add_argument(
+            '--host',
+            default=next(
+                (host for host in settings.ALLOWED_HOSTS if '*' not in host),
+                'localhost',
+            ),
+            help='Заголовок Host для запросов с --local.',
+        )
+
+    def handle(self, *args, **options):
+        self.base_url = (
+            '' if options['local'] else options['base_url'].rstrip('/')
+        )
+        self.host = options['host']
+        self.throttle = Throttle(options['rate'])
+        if not self.base_url:
+            self.handler = BaseHandler()
+            self.handler.load_middleware()
+            self.factory = RequestFactory()
+        paths = self.popular_paths(
+            options['index_pages'], options['groups'], options['authors']
+        )
+        started = time.monotonic()
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(options['workers']) as executor:
+                results = list(executor.map(self.fetch_in_thread, paths))
+        else:
+            results = [self.fetch(path) for path in paths]
+        elapsed = time.monotonic() - started
+        for path, status, duration in sorted(
+            results, key=lambda result: -result[2]
+        ):
+            if options['verbosity'] > 1 or status != 200:
+                self.stdout.write(f'{status} {duration * 1000:7.1f} мс {path}')
+        failed = sum(1 for _, status, _ in results if status != 200)
+        total = sum(duration for _, _, duration in results)
+        self.stdout.write(
+            f'Прогрето страниц: {len(results) - failed}, ошибок: {failed}, '
+            f'время: {elapsed:.1f} с (сумма по запросам {total:.1f} с)'
+        )
+
+    def popular_paths(self, index_pages, group_count, author_count):
+        index = reverse('posts:index')
+        paths = [
+            index if number == 1 else f'{index}?page={number}'
+            for number in range(1, index_pages + 1)
+        ]
+        slugs = (
+            GroupStats.objects.filter(posts_count__gt=0)
+            .order_by('-posts_count')
+            .values_list('group__slug', flat=True)[:group_count]
+        )
+        paths.extend(
+            reverse('posts:group_posts', kwargs={'slug': slug})
+            for slug in slugs
+        )
+        usernames = (
+            User.objects.annotate(followers=Count('following'))
+            .filter(followers__gt=0)
+            .order_by('-followers')
+            .values_list('username', flat=True)[:author_count]
+        )
+        paths.extend(
+            reverse('posts:profile', kwargs={'username': username})
+            for username in usernames
+        )
+        return paths
+
+    def fetch_in_thread(self, path):
+        try:
+            return self.fetch(path)
+        finally:
+            connection.close()
+
+    def fetch(self, path):
+        self.throttle.wait()
+        started = time.monotonic()
+        if self.base_url:
+            status = self.fetch_http(path)
+        else:
+            status = self.fetch_local(path)
+        return path, status, time.monotonic() - started
+
+    def fetch_http(self, path):
+        try:
+            with urlopen(self.base_url + path, timeout=60) as response:
+                response.read()
+                return response.status
+        except HTTPError as error:
+            return error.code
+        except URLError:
+            return 0
+
+    def fetch_local(self, path):
+        request = self.factory.get(path, HTTP_HOST=self.host)
+        response = self.handler.get_response(request)
+        return response.status_code
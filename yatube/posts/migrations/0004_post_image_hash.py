@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-19 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_added_comment_and_follow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, verbose_name='Хеш картинки'),
+        ),
+    ]
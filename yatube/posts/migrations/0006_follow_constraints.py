@@ -0,0 +1,40 @@
+# Generated by Django 2.2.6 on 2026-10-19 09:21
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+import django.db.models.expressions
+
+
+def remove_invalid_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Follow.objects.filter(user=F('author')).delete()
+    duplicates = (
+        Follow.objects.values('user', 'author')
+        .annotate(first_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        Follow.objects.filter(
+            user=row['user'], author=row['author']
+        ).exclude(id=row['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_image_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_invalid_follows, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(_negated=True, user=django.db.models.expressions.F('author')), name='prevent_self_follow'),
+        ),
+    ]
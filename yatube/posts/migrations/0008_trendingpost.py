@@ -0,0 +1,26 @@
+# Generated by Django 2.2.6 on 2026-10-19 09:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_recommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Post')),
+                ('score', models.FloatField(db_index=True, verbose_name='Оценка')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='Комментариев')),
+                ('last_comment_id', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-score'],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.6 on 2026-10-19 09:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_trendingpost'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('last_post_at', models.DateTimeField(blank=True, null=True, verbose_name='Последняя запись')),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.6 on 2026-10-19 09:28
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_posters(apps, schema_editor):
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    Post = apps.get_model('posts', 'Post')
+    posters = (
+        Post.objects.filter(group__isnull=False)
+        .values('group_id')
+        .annotate(count=Count('author', distinct=True))
+        .order_by()
+    )
+    for row in posters:
+        GroupStats.objects.filter(group_id=row['group_id']).update(
+            posters_count=row['count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_groupstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupstats',
+            name='posters_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Авторов'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'author'], name='posts_post_group_i_4c1b9d_idx'),
+        ),
+        migrations.RunPython(count_posters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.6 on 2026-10-19 09:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0010_groupstats_posters_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('delete_posts', 'Удаление постов авторов'), ('move_posts', 'Перенос постов в группу'), ('purge_users', 'Удаление комментариев и подписок')], max_length=20, verbose_name='Действие')),
+                ('params', models.TextField(default='{}', verbose_name='Параметры')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], db_index=True, default='pending', max_length=10, verbose_name='Состояние')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Всего')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Обработано')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Модератор')),
+            ],
+            options={
+                'verbose_name': 'Задача модерации',
+                'verbose_name_plural': 'Задачи модерации',
+                'ordering': ['-created'],
+            },
+        ),
+    ]
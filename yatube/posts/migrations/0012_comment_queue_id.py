@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-19 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_moderationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='queue_id',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 2.2.6 on 2026-10-19 09:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0012_comment_queue_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCursor',
+            fields=[
+                ('source', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('last_id', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('comment', 'Комментарий к посту'), ('follow', 'Подписка')], max_length=10, verbose_name='Вид')),
+                ('actors_count', models.PositiveIntegerField(default=0, verbose_name='Участников')),
+                ('updated', models.DateTimeField(verbose_name='Обновлено')),
+                ('is_read', models.BooleanField(default=False, verbose_name='Прочитано')),
+                ('actors', models.ManyToManyField(related_name='_notification_actors_+', to=settings.AUTH_USER_MODEL, verbose_name='Участники')),
+                ('last_actor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Последний участник')),
+                ('post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='Пост')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL, verbose_name='Получатель')),
+            ],
+            options={
+                'verbose_name': 'Уведомление',
+                'verbose_name_plural': 'Уведомления',
+                'ordering': ['-updated'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read'], name='posts_notif_recipie_7d44a8_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-19 10:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='moderationjob',
+            name='updated',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Обновлено'),
+        ),
+    ]
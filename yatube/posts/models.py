@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from django.db import models
 
 from core.models import CreatedModel
+from core.storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -15,6 +16,21 @@ class Group(models.Model):
         return self.title
 
 
+class GroupStats(models.Model):
+    """Счётчики группы, обновляются сигналами Post."""
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Записей', default=0)
+    posters_count = models.PositiveIntegerField('Авторов', default=0)
+    last_post_at = models.DateTimeField(
+        'Последняя запись', null=True, blank=True
+    )
+
+
 class Post(CreatedModel):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -38,7 +54,16 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
+        blank=True,
+        db_index=True,
+    )
+    image_hash = models.CharField(
+        'Хеш картинки',
+        max_length=64,
         blank=True,
+        db_index=True,
+        editable=False,
     )
 
     def __str__(self):
@@ -48,6 +73,9 @@ class Post(CreatedModel):
         ordering = [
             '-pub_date',
         ]
+        indexes = [
+            models.Index(fields=['group', 'author']),
+        ]
 
 
 class Comment(CreatedModel):
@@ -65,6 +93,15 @@ class Comment(CreatedModel):
         verbose_name='Комментарий к посту',
         help_text='Введите комментарий',
     )
+    # Ключ записи в очереди отложенных комментариев: повторная
+    # обработка той же порции не создаёт дубликатов.
+    queue_id = models.CharField(
+        max_length=32,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+    )
 
     def __str__(self):
         return self.text[:15]
@@ -83,3 +120,177 @@ class Follow(models.Model):
         related_name='following',
         null=True,
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow',
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='prevent_self_follow',
+            ),
+        ]
+
+
+class Recommendation(models.Model):
+    """Рекомендация автора для подписки, рассчитывается командой."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+    )
+    candidate = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'candidate'],
+                name='unique_recommendation',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score']),
+        ]
+
+
+class TrendingPost(models.Model):
+    """Оценка поста в ленте популярного, обновляется командой."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+    )
+    score = models.FloatField('Оценка', db_index=True)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+    last_comment_id = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-score']
+
+
+class ModerationJob(models.Model):
+    """Массовое действие модератора, выполняется в фоне порциями."""
+    DELETE_POSTS = 'delete_posts'
+    MOVE_POSTS = 'move_posts'
+    PURGE_USERS = 'purge_users'
+    KIND_CHOICES = (
+        (DELETE_POSTS, 'Удаление постов авторов'),
+        (MOVE_POSTS, 'Перенос постов в группу'),
+        (PURGE_USERS, 'Удаление комментариев и подписок'),
+    )
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    kind = models.CharField('Действие', max_length=20, choices=KIND_CHOICES)
+    params = models.TextField('Параметры', default='{}')
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+        verbose_name='Модератор',
+    )
+    status = models.CharField(
+        'Состояние',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        db_index=True,
+    )
+    total = models.PositiveIntegerField('Всего', default=0)
+    processed = models.PositiveIntegerField('Обработано', default=0)
+    error = models.TextField('Ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    # Обновляется после каждой порции: задачу, которая давно не
+    # продвигалась, можно продолжить в другом процессе.
+    updated = models.DateTimeField('Обновлено', null=True, blank=True)
+    finished = models.DateTimeField('Завершено', null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name = 'Задача модерации'
+        verbose_name_plural = 'Задачи модерации'
+
+    def __str__(self):
+        return f'{self.get_kind_display()} #{self.pk}'
+
+
+class Notification(models.Model):
+    """
+    Уведомление пользователя. Непрочитанное уведомление одного вида о
+    том же посте одно: новые события дополняют его, а не создают новые.
+    """
+    COMMENT = 'comment'
+    FOLLOW = 'follow'
+    KIND_CHOICES = (
+        (COMMENT, 'Комментарий к посту'),
+        (FOLLOW, 'Подписка'),
+    )
+
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Получатель',
+    )
+    kind = models.CharField('Вид', max_length=10, choices=KIND_CHOICES)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Пост',
+    )
+    actors = models.ManyToManyField(
+        User,
+        related_name='+',
+        verbose_name='Участники',
+    )
+    actors_count = models.PositiveIntegerField('Участников', default=0)
+    last_actor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+        verbose_name='Последний участник',
+    )
+    updated = models.DateTimeField('Обновлено')
+    is_read = models.BooleanField('Прочитано', default=False)
+
+    class Meta:
+        ordering = ['-updated']
+        indexes = [models.Index(fields=['recipient', 'is_read'])]
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+
+    def __str__(self):
+        return f'{self.get_kind_display()} для {self.recipient}'
+
+    @property
+    def others_count(self):
+        return max(self.actors_count - 1, 0)
+
+
+class NotificationCursor(models.Model):
+    """Последний разосланный в уведомления id событий источника."""
+    source = models.CharField(max_length=20, primary_key=True)
+    last_id = models.PositiveIntegerField(default=0)
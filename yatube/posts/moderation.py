@@ -0,0 +1,170 @@
+import json
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.tasks import task
+
+from . import feeds, follows
+from .groups import refresh_stats
+from .models import Comment, Follow, ModerationJob, Post, User
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+
+
+def _delete(model, ids):
+    # delete() по queryset посылает сигналы, поэтому файлы картинок и
+    # статистика групп обновляются как при удалении по одному.
+    model.objects.filter(pk__in=ids).delete()
+
+
+def _move_posts(group_id, ids):
+    posts = Post.objects.filter(pk__in=ids)
+    rows = set(posts.values_list('group_id', 'author_id'))
+    posts.update(group_id=group_id)
+    # update() сигналов не посылает, поэтому статистику групп и число
+    # постов в лентах обновляем сами.
+    group_ids = {old_group_id for old_group_id, _ in rows} | {group_id}
+    refresh_stats(sorted(group_ids - {None}))
+    feeds.invalidate(
+        group_ids=group_ids,
+        author_ids={author_id for _, author_id in rows},
+    )
+
+
+def _delete_follows(ids):
+    follows_qs = Follow.objects.filter(pk__in=ids)
+    authors = defaultdict(set)
+    for user_id, author_id in follows_qs.values_list('user_id', 'author_id'):
+        authors[user_id].add(author_id)
+    follows_qs.delete()
+    users = User.objects.in_bulk(
+        set(authors).union(*authors.values())
+    )
+    for user_id, author_ids in authors.items():
+        follows.invalidate(
+            users[user_id], [users[pk] for pk in author_ids]
+        )
+
+
+def _delete_posts_steps(author_ids):
+    return [
+        (Post.objects.filter(author_id__in=author_ids), partial(_delete, Post))
+    ]
+
+
+def _move_posts_steps(post_ids, group_id):
+    posts = Post.objects.filter(pk__in=post_ids).exclude(group_id=group_id)
+    return [(posts, partial(_move_posts, group_id))]
+
+
+def _purge_users_steps(user_ids):
+    return [
+        (
+            Comment.objects.filter(author_id__in=user_ids),
+            partial(_delete, Comment),
+        ),
+        (
+            Follow.objects.filter(
+                Q(user_id__in=user_ids) | Q(author_id__in=user_ids)
+            ),
+            _delete_follows,
+        ),
+    ]
+
+
+STEPS = {
+    ModerationJob.DELETE_POSTS: _delete_posts_steps,
+    ModerationJob.MOVE_POSTS: _move_posts_steps,
+    ModerationJob.PURGE_USERS: _purge_users_steps,
+}
+
+
+class JobBusy(Exception):
+    """Задачу модерации сейчас выполняет другой процесс."""
+
+
+def stale_before(now=None):
+    """
+    Время, раньше которого должна была обновиться задача в работе,
+    чтобы её можно было продолжить: её исполнитель, видимо, остановлен.
+    """
+    return (now or timezone.now()) - timedelta(
+        seconds=getattr(settings, 'TASKS_LOCK_TIMEOUT', 10 * 60)
+    )
+
+
+def runnable_jobs(now=None):
+    """Задачи в очереди и задачи в работе, которые давно не обновлялись."""
+    return ModerationJob.objects.filter(
+        Q(status=ModerationJob.PENDING)
+        | Q(status=ModerationJob.RUNNING, updated__lt=stale_before(now))
+    )
+
+
+def start_job(kind, created_by=None, **params):
+    """
+    Создаёт задачу модерации и ставит её выполнение в очередь фоновых
+    задач core.tasks; при TASKS_EAGER = True она выполняется сразу.
+    """
+    job = ModerationJob.objects.create(
+        kind=kind, params=json.dumps(params), created_by=created_by
+    )
+    run_job.delay(job.pk)
+    return job
+
+
+# Ошибки самих действий run_job записывает в задачу модерации, а
+# повторяется только попытка взять задачу, занятую другим процессом.
+@task(max_attempts=5)
+def run_job(job_id):
+    """
+    Выполняет задачу порциями по CHUNK_SIZE строк, каждая в своей
+    транзакции, и после каждой порции сохраняет прогресс. Задача в
+    работе, которая не обновлялась TASKS_LOCK_TIMEOUT секунд,
+    продолжается с сохранённого прогресса: действия выбирают только
+    ещё не обработанные строки. Если задачу выполняет другой процесс,
+    бросает JobBusy, и фоновая задача повторится позже.
+    """
+    now = timezone.now()
+    jobs = ModerationJob.objects.filter(pk=job_id)
+    if not runnable_jobs(now).filter(pk=job_id).update(
+        status=ModerationJob.RUNNING, updated=now
+    ):
+        if jobs.filter(status=ModerationJob.RUNNING).exists():
+            raise JobBusy(job_id)
+        return
+    job = jobs.get()
+    try:
+        steps = STEPS[job.kind](**json.loads(job.params))
+        remaining = sum(queryset.count() for queryset, _ in steps)
+        jobs.update(total=F('processed') + remaining)
+        for queryset, action in steps:
+            queryset = queryset.order_by('pk').values_list('pk', flat=True)
+            while True:
+                ids = list(queryset[:CHUNK_SIZE])
+                if not ids:
+                    break
+                with transaction.atomic():
+                    action(ids)
+                jobs.update(
+                    processed=F('processed') + len(ids),
+                    updated=timezone.now(),
+                )
+    except Exception as error:
+        logger.exception('Задача модерации %s завершилась ошибкой', job_id)
+        jobs.update(
+            status=ModerationJob.FAILED,
+            error=str(error),
+            finished=timezone.now(),
+        )
+    else:
+        jobs.update(status=ModerationJob.DONE, finished=timezone.now())
@@ -0,0 +1,201 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Comment, Follow, Notification, NotificationCursor
+
+BATCH_SIZE = 1000
+UNREAD_KEY = 'notifications:unread:{}'
+
+
+class CursorMoved(Exception):
+    """Порцию событий уже разослал другой процесс."""
+
+
+def _comment_events(last_id, batch_size):
+    rows = (
+        Comment.objects.filter(pk__gt=last_id)
+        .order_by('pk')
+        .values_list(
+            'pk', 'post__author_id', 'post_id', 'author_id', 'pub_date'
+        )[:batch_size]
+    )
+    return list(rows)
+
+
+def _follow_events(last_id, batch_size):
+    # У подписки нет даты, временем события считается момент рассылки.
+    now = timezone.now()
+    rows = (
+        Follow.objects.filter(pk__gt=last_id)
+        .order_by('pk')
+        .values_list('pk', 'author_id', 'user_id')[:batch_size]
+    )
+    return [
+        (pk, author_id, None, user_id, now) for pk, author_id, user_id in rows
+    ]
+
+
+SOURCES = {
+    Notification.COMMENT: _comment_events,
+    Notification.FOLLOW: _follow_events,
+}
+
+
+def _coalesce(events):
+    """
+    Сводит события к {(получатель, пост): (участники, последний
+    участник, время)}. События о собственных действиях пропускаются.
+    """
+    groups = {}
+    for _, recipient_id, post_id, actor_id, when in events:
+        if actor_id is None or recipient_id == actor_id:
+            continue
+        actors, _, updated = groups.get(
+            (recipient_id, post_id), ({}, None, when)
+        )
+        actors[actor_id] = None
+        groups[(recipient_id, post_id)] = (
+            actors, actor_id, max(updated, when)
+        )
+    return groups
+
+
+def _unread(kind, keys):
+    post_ids = {post_id for _, post_id in keys if post_id is not None}
+    return {
+        (notification.recipient_id, notification.post_id): notification
+        for notification in Notification.objects.filter(
+            Q(post_id__in=post_ids) | Q(post__isnull=True),
+            kind=kind,
+            is_read=False,
+            recipient_id__in={recipient_id for recipient_id, _ in keys},
+        )
+    }
+
+
+def _apply(kind, groups):
+    existing = _unread(kind, groups)
+    Notification.objects.bulk_create([
+        Notification(
+            recipient_id=recipient_id,
+            kind=kind,
+            post_id=post_id,
+            updated=updated,
+        )
+        for (recipient_id, post_id), (_, _, updated) in groups.items()
+        if (recipient_id, post_id) not in existing
+    ])
+    # bulk_create в SQLite не возвращает id, поэтому перечитываем.
+    notifications = _unread(kind, groups)
+    through = Notification.actors.through
+    through.objects.bulk_create(
+        [
+            through(notification_id=notifications[key].pk, user_id=actor_id)
+            for key, (actors, _, _) in groups.items()
+            for actor_id in actors
+        ],
+        ignore_conflicts=True,
+    )
+    counts = dict(
+        through.objects.filter(
+            notification_id__in=[item.pk for item in notifications.values()]
+        )
+        .values('notification_id')
+        .annotate(count=Count('pk'))
+        .values_list('notification_id', 'count')
+    )
+    changed = []
+    for key, (_, last_actor_id, updated) in groups.items():
+        notification = notifications[key]
+        notification.last_actor_id = last_actor_id
+        notification.updated = max(notification.updated, updated)
+        notification.actors_count = counts.get(notification.pk, 0)
+        changed.append(notification)
+    Notification.objects.bulk_update(
+        changed, ['last_actor', 'updated', 'actors_count']
+    )
+
+
+def _fan_out_batch(kind, batch_size):
+    cursor, _ = NotificationCursor.objects.get_or_create(source=kind)
+    events = SOURCES[kind](cursor.last_id, batch_size)
+    if not events:
+        return 0, set()
+    groups = _coalesce(events)
+    with transaction.atomic():
+        if groups:
+            _apply(kind, groups)
+        # Сдвиг курсора с проверкой старого значения: если порцию
+        # параллельно разослал другой процесс, транзакция откатится.
+        if not NotificationCursor.objects.filter(
+            source=kind, last_id=cursor.last_id
+        ).update(last_id=events[-1][0]):
+            raise CursorMoved
+    return len(events), {recipient_id for recipient_id, _ in groups}
+
+
+def fan_out(batch_size=BATCH_SIZE):
+    """
+    Создаёт уведомления о новых комментариях и подписках порциями по
+    batch_size событий, каждая в своей транзакции. События читаются
+    после последнего обработанного id, запросы к ним в запросе
+    пользователя не нужны. Возвращает число обработанных событий.
+    """
+    total = 0
+    for kind in SOURCES:
+        while True:
+            try:
+                count, recipients = _fan_out_batch(kind, batch_size)
+            except CursorMoved:
+                continue
+            if not count:
+                break
+            total += count
+            invalidate_unread(*recipients)
+    return total
+
+
+def _cache():
+    return caches[getattr(settings, 'NOTIFICATIONS_CACHE_ALIAS', 'shared')]
+
+
+def unread_count(user):
+    """
+    Число непрочитанных уведомлений. Хранится в общем кеше процессов:
+    рассылка идёт в отдельном процессе и сбрасывает его оттуда.
+    """
+    key = UNREAD_KEY.format(user.pk)
+    count = _cache().get(key)
+    if count is None:
+        count = Notification.objects.filter(
+            recipient=user, is_read=False
+        ).count()
+        _cache().set(
+            key, count, getattr(settings, 'NOTIFICATIONS_COUNT_TIMEOUT', 60)
+        )
+    return count
+
+
+def invalidate_unread(*user_ids):
+    _cache().delete_many(
+        [UNREAD_KEY.format(user_id) for user_id in user_ids]
+    )
+
+
+def mark_read(user, notifications):
+    """
+    Отмечает прочитанными показанные пользователю уведомления, а не все:
+    уведомления на других страницах он ещё не видел.
+    """
+    ids = [
+        notification.pk for notification in notifications
+        if not notification.is_read
+    ]
+    if ids:
+        Notification.objects.filter(recipient=user, pk__in=ids).update(
+            is_read=True
+        )
+        invalidate_unread(user.pk)
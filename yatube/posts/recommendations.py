@@ -0,0 +1,136 @@
+from collections import Counter, defaultdict
+from heapq import nlargest
+from itertools import islice
+
+from django.db import transaction
+
+from . import follows
+from .models import Comment, Follow, Post, Recommendation
+
+FRIEND_OF_FRIEND_WEIGHT = 1.0
+CO_GROUP_WEIGHT = 0.5
+COMMENT_WEIGHT = 2.0
+
+# Ограничения на вклад «тяжёлых» вершин: без них один популярный
+# автор или большая группа дают квадратичное число пар.
+MAX_FANOUT = 200
+MAX_GROUP_POSTERS = 500
+
+TOP_K = 10
+BATCH_SIZE = 500
+
+
+class Graph:
+    """
+    Граф взаимодействий в памяти: списки смежности в виде множеств id.
+    Загружается потоково через values_list().iterator(), без создания
+    объектов моделей.
+    """
+
+    def __init__(self):
+        self.following = defaultdict(set)
+        self.user_groups = defaultdict(set)
+        self.group_posters = defaultdict(set)
+        self.commented = defaultdict(Counter)
+
+    @classmethod
+    def load(cls):
+        graph = cls()
+        edges = Follow.objects.values_list('user_id', 'author_id')
+        for user_id, author_id in edges.iterator():
+            graph.following[user_id].add(author_id)
+        posters = (
+            Post.objects.filter(group__isnull=False)
+            .values_list('group_id', 'author_id')
+            .distinct()
+            .order_by()
+        )
+        for group_id, author_id in posters.iterator():
+            graph.user_groups[author_id].add(group_id)
+            graph.group_posters[group_id].add(author_id)
+        comments = Comment.objects.values_list('author_id', 'post__author_id')
+        for user_id, author_id in comments.iterator():
+            graph.commented[user_id][author_id] += 1
+        return graph
+
+    def users(self):
+        return (
+            set(self.following) | set(self.user_groups) | set(self.commented)
+        )
+
+    def score(self, user_id):
+        """Оценки кандидатов для одного пользователя."""
+        scores = Counter()
+        following = self.following.get(user_id, ())
+        for followee in following:
+            second = self.following.get(followee, ())
+            for candidate in islice(second, MAX_FANOUT):
+                scores[candidate] += FRIEND_OF_FRIEND_WEIGHT
+        for group_id in self.user_groups.get(user_id, ()):
+            posters = self.group_posters[group_id]
+            if len(posters) > MAX_GROUP_POSTERS:
+                continue
+            for candidate in posters:
+                scores[candidate] += CO_GROUP_WEIGHT
+        for candidate, count in self.commented.get(user_id, {}).items():
+            scores[candidate] += COMMENT_WEIGHT * count
+        scores.pop(user_id, None)
+        for author_id in following:
+            scores.pop(author_id, None)
+        return scores
+
+
+def top_candidates(graph, user_id, top_k=TOP_K):
+    return nlargest(top_k, graph.score(user_id).items(), key=lambda x: x[1])
+
+
+def compute_recommendations(top_k=TOP_K, batch_size=BATCH_SIZE):
+    """
+    Пересчитывает таблицу рекомендаций для всех пользователей.
+    Записывает пачками по batch_size пользователей. Возвращает
+    число созданных рекомендаций.
+    """
+    graph = Graph.load()
+    users = sorted(graph.users())
+    total = 0
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        rows = [
+            Recommendation(user_id=user_id, candidate_id=candidate, score=s)
+            for user_id in batch
+            for candidate, s in top_candidates(graph, user_id, top_k)
+        ]
+        with transaction.atomic():
+            Recommendation.objects.filter(user_id__in=batch).delete()
+            Recommendation.objects.bulk_create(rows)
+        total += len(rows)
+    stale = sorted(
+        set(
+            Recommendation.objects.values_list('user_id', flat=True)
+            .distinct()
+        )
+        - set(users)
+    )
+    for start in range(0, len(stale), batch_size):
+        Recommendation.objects.filter(
+            user_id__in=stale[start:start + batch_size]
+        ).delete()
+    return total
+
+
+def suggestions_for(user, limit=5):
+    """
+    Готовые рекомендации из таблицы, одним запросом по индексу.
+    Авторы, на которых user подписался после расчёта, отбрасываются
+    по закешированному графу подписок.
+    """
+    rows = (
+        Recommendation.objects.filter(user=user)
+        .select_related('candidate')[:limit * 2]
+    )
+    following = follows.is_following_many(
+        user, [row.candidate_id for row in rows]
+    )
+    return [
+        row.candidate for row in rows if not following[row.candidate_id]
+    ][:limit]
@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core.pagination import invalidate_counts
+
+from . import feeds, groups
+from .images import release_image
+from .models import Group, Post, User
+
+
+def _image_name(instance):
+    # Читаем значение напрямую, чтобы не подгружать отложенное поле.
+    value = instance.__dict__.get('image')
+    return getattr(value, 'name', value) or ''
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    instance._loaded_image = _image_name(instance)
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, created, **kwargs):
+    old_name = instance._loaded_image
+    instance._loaded_image = _image_name(instance)
+    if not created and old_name and old_name != instance._loaded_image:
+        transaction.on_commit(lambda: release_image(old_name))
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    name = _image_name(instance)
+    if name:
+        transaction.on_commit(lambda: release_image(name))
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    old_group_id = None if created else instance._loaded_group_id
+    instance._loaded_group_id = instance.group_id
+    if created or old_group_id != instance.group_id:
+        feeds.invalidate(
+            group_ids=(old_group_id, instance.group_id),
+            author_ids=(instance.author_id,),
+        )
+    if old_group_id == instance.group_id:
+        return
+    if old_group_id is not None:
+        groups.post_removed(old_group_id, instance.author_id, instance.pk)
+    if instance.group_id is not None:
+        groups.post_added(
+            instance.group_id,
+            instance.author_id,
+            instance.pk,
+            instance.pub_date,
+        )
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    feeds.invalidate(
+        group_ids=(instance.group_id,), author_ids=(instance.author_id,)
+    )
+    if instance.group_id is not None:
+        groups.post_removed(instance.group_id, instance.author_id, None)
+
+
+@receiver(post_init, sender=Group)
+def remember_slug(sender, instance, **kwargs):
+    instance._loaded_slug = instance.__dict__.get('slug')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    groups.invalidate(instance._loaded_slug, instance.slug)
+    instance._loaded_slug = instance.slug
+    if kwargs.get('created', True):
+        # id удалённой группы может достаться новой.
+        invalidate_counts(feeds.GROUP_INDEX, feeds.group_feed(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def invalidate_new_profile(sender, instance, created, **kwargs):
+    if created:
+        invalidate_counts(feeds.profile_feed(instance.pk))
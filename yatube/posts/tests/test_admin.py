@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.group = group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        for i in range(5):
+            author = User.objects.create_user(username=f'author{i}')
+            Post.objects.create(author=author, group=group, text='Т' * 200)
+        cls.url = reverse('admin:posts_post_changelist')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def test_changelist_shows_short_text(self):
+        """В списке постов текст обрезан."""
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Т' * 80 + '…')
+        self.assertNotContains(response, 'Т' * 81)
+
+    def test_authors_are_not_queried_per_row(self):
+        """Авторы и группы постов выбираются вместе с постами."""
+        with self.assertNumQueries(7) as context:
+            self.client.get(self.url)
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertEqual(
+            [sql for sql in queries if 'FROM "auth_user"' in sql], queries[:1]
+        )
+        self.assertFalse(
+            [sql for sql in queries if 'FROM "posts_group" WHERE' in sql]
+        )
+        author = User.objects.create_user(username='new_author')
+        Post.objects.create(author=author, group=self.group, text='Новый')
+        # Администратор теперь берётся из кеша (шапка админки догружает
+        # только его пароль для ссылки смены пароля), а строка с группой
+        # не добавляет запросов.
+        with self.assertNumQueries(7) as context:
+            response = self.client.get(self.url)
+        self.assertContains(
+            response,
+            f'<option value="{self.group.pk}" selected>{self.group}</option>',
+            count=6,
+        )
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertEqual(
+            [
+                sql.split(' FROM ')[0] for sql in queries
+                if 'FROM "auth_user"' in sql
+            ],
+            ['SELECT "auth_user"."id", "auth_user"."password"'],
+        )
+
+    def test_group_is_editable_in_changelist(self):
+        """Группа поста меняется прямо в списке."""
+        other = Group.objects.create(title='Другая', slug='other')
+        posts = list(Post.objects.order_by('-pub_date', '-pk'))
+        data = {
+            'form-TOTAL_FORMS': len(posts),
+            'form-INITIAL_FORMS': len(posts),
+            '_save': 'Сохранить',
+        }
+        for index, post in enumerate(posts):
+            data[f'form-{index}-id'] = post.pk
+            data[f'form-{index}-group'] = self.group.pk
+        data['form-0-group'] = other.pk
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Post.objects.get(pk=posts[0].pk).group, other)
+        self.assertEqual(Post.objects.filter(group=self.group).count(), 4)
@@ -0,0 +1,155 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import comment_queue
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_WRITE_BEHIND=True, COMMENT_FLUSH_INTERVAL=0)
+class CommentQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        self.queue_dir = tempfile.mkdtemp()
+        settings_override = override_settings(COMMENT_QUEUE_DIR=self.queue_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.queue_dir, ignore_errors=True)
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+
+    def add_comment(self, text, post_id=None):
+        return self.client.post(
+            reverse(
+                'posts:add_comment',
+                kwargs={'post_id': post_id or self.post.pk},
+            ),
+            data={'text': text},
+        )
+
+    def test_comment_is_queued_and_shown_to_author(self):
+        """
+        Комментарий из очереди до записи в базу видит только его автор.
+        """
+        response = self.add_comment('Отложенный комментарий')
+        self.assertRedirects(response, self.detail_url)
+        self.assertFalse(Comment.objects.exists())
+        response = self.client.get(self.detail_url)
+        pending = response.context['pending_comments']
+        self.assertEqual(
+            [comment.text for comment in pending], ['Отложенный комментарий']
+        )
+        self.assertContains(response, 'ожидает публикации')
+        other = Client()
+        response = other.get(self.detail_url)
+        self.assertEqual(response.context['pending_comments'], [])
+
+    def test_flush_saves_comments_and_clears_pending(self):
+        """
+        Сброс очереди записывает комментарии в базу и убирает их из
+        ожидающих в сессии.
+        """
+        self.add_comment('Первый')
+        self.add_comment('Второй')
+        self.assertEqual(comment_queue.flush(), 2)
+        self.assertEqual(
+            list(self.post.comments.values_list('text', flat=True)),
+            ['Первый', 'Второй'],
+        )
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.context['pending_comments'], [])
+        self.assertEqual(
+            self.client.session[comment_queue.PENDING_KEY], []
+        )
+        self.assertEqual(comment_queue.flush(), 0)
+
+    def test_replayed_batch_does_not_duplicate(self):
+        """
+        Порция, оставшаяся после сбоя, записывается повторно без
+        дубликатов, а недописанная строка пропускается.
+        """
+        entry = comment_queue.enqueue(self.post.pk, self.user.pk, 'Текст')
+        path = os.path.join(self.queue_dir, comment_queue.QUEUE_NAME)
+        with open(path, encoding='utf-8') as queue:
+            line = queue.read()
+        comment_queue.flush()
+        # Порция, оставшаяся после сбоя, и недописанная строка.
+        batch = os.path.join(
+            self.queue_dir, f'{comment_queue.BATCH_PREFIX}0.jsonl'
+        )
+        with open(batch, 'w', encoding='utf-8') as leftover:
+            leftover.write(line + '{"queue_id": ')
+        comment_queue.flush()
+        self.assertEqual(
+            list(Comment.objects.values_list('queue_id', flat=True)),
+            [entry['queue_id']],
+        )
+        self.assertFalse(os.path.exists(batch))
+
+    def test_comment_keeps_time_it_was_sent(self):
+        """Датой комментария остаётся время отправки, а не записи."""
+        sent = timezone.now() - timedelta(minutes=5)
+        with mock.patch.object(timezone, 'now', return_value=sent):
+            self.add_comment('Отправлен раньше')
+        comment_queue.flush()
+        self.assertEqual(Comment.objects.get().pub_date, sent)
+
+    def test_comments_to_deleted_posts_are_dropped(self):
+        """Комментарии к удалённому за время ожидания посту отбрасываются."""
+        post = Post.objects.create(author=self.user, text='Удаляемый пост')
+        self.add_comment('Комментарий', post_id=post.pk)
+        post.delete()
+        self.assertEqual(comment_queue.flush(), 0)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_discarded_comment_is_not_pending(self):
+        """
+        Комментарий, отброшенный при сбросе очереди, не остаётся в
+        ожидающих.
+        """
+        self.add_comment('Отброшенный')
+        with mock.patch.object(comment_queue, '_save', return_value=0):
+            comment_queue.flush()
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.context['pending_comments'], [])
+        self.assertEqual(
+            self.client.session[comment_queue.PENDING_KEY], []
+        )
+        self.assertFalse(Comment.objects.exists())
+
+    def test_missing_post_returns_404(self):
+        """Комментарий к несуществующему посту не ставится в очередь."""
+        response = self.add_comment('Комментарий', post_id=self.post.pk + 100)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_invalid_form_is_not_queued(self):
+        """Пустой комментарий не ставится в очередь."""
+        self.add_comment('')
+        self.assertEqual(comment_queue.flush(), 0)
+
+    def test_flush_comments_command(self):
+        """Команда flush_comments записывает очередь и пишет отчёт."""
+        self.add_comment('Из команды')
+        out = StringIO()
+        call_command('flush_comments', stdout=out)
+        self.assertIn('Записано комментариев: 1', out.getvalue())
+        self.assertTrue(Comment.objects.filter(text='Из команды').exists())
@@ -0,0 +1,57 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..digest import follow_digests
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+class FollowDigestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com'
+        )
+        cls.no_email = User.objects.create_user(username='no_email')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(2)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+            Follow.objects.create(user=cls.no_email, author=author)
+            Post.objects.create(author=author, text=f'Пост {author}')
+        old = Post.objects.create(author=cls.authors[0], text='Старый пост')
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=3)
+        )
+
+    def test_digests_are_built_in_bulk(self):
+        """Сводка собирается тремя запросами, без старых постов."""
+        since = timezone.now() - timedelta(days=1)
+        with self.assertNumQueries(3):
+            digests = follow_digests(since)
+        self.assertEqual(list(digests), [self.reader])
+        self.assertEqual(
+            sorted(post.text for post in digests[self.reader]),
+            ['Пост author0', 'Пост author1'],
+        )
+
+    def test_command_sends_one_email_per_reader(self):
+        out = StringIO()
+        call_command(
+            'send_follow_digest', '--base-url=http://testserver', stdout=out
+        )
+        self.assertIn('Отправлено писем: 1', out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, ['reader@example.com'])
+        self.assertIn('Пост author1', message.body)
+        self.assertNotIn('Старый пост', message.body)
+        self.assertIn('http://testserver/follow/', message.body)
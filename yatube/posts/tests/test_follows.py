@@ -0,0 +1,144 @@
+import threading
+from array import array
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import OperationalError, connection, transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from .. import follows
+from ..models import Follow
+
+User = get_user_model()
+
+
+class FollowServiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+
+    def test_follow_is_idempotent(self):
+        """
+        Повторная подписка не создаёт вторую запись.
+        """
+        self.assertTrue(follows.follow(self.user, self.author))
+        self.assertFalse(follows.follow(self.user, self.author))
+        self.assertFalse(follows.follow(self.user, self.user))
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 1)
+        self.assertTrue(follows.unfollow(self.user, self.author))
+        self.assertFalse(follows.unfollow(self.user, self.author))
+
+    def test_follower_count_is_reset_on_write(self):
+        """
+        Счётчик подписчиков берётся из кеша и сбрасывается при подписке
+        и отписке.
+        """
+        self.assertEqual(follows.follower_count(self.author), 0)
+        follows.follow(self.user, self.author)
+        with self.assertNumQueries(1):
+            self.assertEqual(follows.follower_count(self.author), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(follows.follower_count(self.author), 1)
+        follows.unfollow(self.user, self.author)
+        self.assertEqual(follows.follower_count(self.author), 0)
+
+    def test_follow_state_is_read_from_cache(self):
+        """
+        Проверки подписок после первого чтения не обращаются к БД.
+        """
+        other = User.objects.create_user(username='other')
+        follows.follow(self.user, self.author)
+        follows.follow(self.author, self.user)
+        follows.following_ids(self.user)
+        follows.follower_ids(self.user)
+        with self.assertNumQueries(0):
+            self.assertTrue(follows.is_following(self.user, self.author))
+            self.assertFalse(follows.is_following(self.user, other))
+            self.assertEqual(
+                follows.is_following_many(
+                    self.user, [self.author.pk, other.pk]
+                ),
+                {self.author.pk: True, other.pk: False},
+            )
+            self.assertEqual(follows.mutuals(self.user), [self.author.pk])
+        follows.unfollow(self.user, self.author)
+        with self.assertNumQueries(1):
+            self.assertFalse(follows.is_following(self.user, self.author))
+        with self.assertNumQueries(0):
+            self.assertEqual(follows.mutuals(self.user), [])
+
+    def test_follow_returns_json_when_requested(self):
+        """
+        Подписка отдаёт JSON, если клиент его запросил.
+        """
+        url = reverse(
+            'posts:profile_follow', kwargs={'username': self.author.username}
+        )
+        response = self.user_client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            response.json(), {'following': True, 'follower_count': 1}
+        )
+        response = self.user_client.get(url)
+        self.assertRedirects(
+            response,
+            reverse(
+                'posts:profile', kwargs={'username': self.author.username}
+            ),
+        )
+
+
+class FollowConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cache_is_reset_after_commit(self):
+        """
+        Состояние, закешированное другим процессом до коммита подписки,
+        сбрасывается после коммита.
+        """
+        user = User.objects.create_user(username='HasNoName')
+        author = User.objects.create_user(username='author')
+        with transaction.atomic():
+            follows.follow(user, author)
+            # Так кеш заполнил бы процесс, не видящий новую запись.
+            caches['shared'].set(
+                follows.FOLLOWING_KEY.format(follows.user_token(user)),
+                array('q'),
+            )
+        self.assertTrue(follows.is_following(user, author))
+
+    def test_parallel_follows_create_one_row(self):
+        """
+        Параллельные подписки создают ровно одну запись.
+        """
+        user = User.objects.create_user(username='HasNoName')
+        author = User.objects.create_user(username='author')
+        barrier = threading.Barrier(8)
+
+        def worker():
+            barrier.wait()
+            try:
+                follows.follow(user, author)
+            except OperationalError:
+                # SQLite может отказать в блокировке, это не дубль.
+                pass
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(
+            Follow.objects.filter(user=user, author=author).count(), 1
+        )
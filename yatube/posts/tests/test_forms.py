@@ -1,6 +1,10 @@
+import os
 import shutil
 import tempfile
+import time
 from http import HTTPStatus
+from io import BytesIO
+from unittest.mock import patch
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -8,8 +12,10 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.db.models.fields.files import ImageFieldFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from ..forms import PostForm
+from ..images import IMAGE_MAX_SIDE
 from ..models import Group, Post
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -178,3 +184,104 @@ class PostFormTests(TestCase):
             follow=True,
         )
         self.assertEqual(comments_count, self.post.comments.count())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    @staticmethod
+    def get_jpeg(name, size):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        Image.new('RGB', size, color=(255, 0, 0)).save(
+            buffer, 'JPEG', exif=exif
+        )
+        return SimpleUploadedFile(
+            name=name,
+            content=buffer.getvalue(),
+            content_type='image/jpeg',
+        )
+
+    def test_large_image_is_downscaled_without_exif(self):
+        """
+        Большая картинка уменьшается, а EXIF удаляется.
+        """
+        self.author_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с большой картинкой',
+                'image': self.get_jpeg('big.jpg', (IMAGE_MAX_SIDE * 2, 100)),
+            },
+        )
+        post = Post.objects.get(text='Пост с большой картинкой')
+        self.assertEqual(len(post.image_hash), 64)
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size[0], IMAGE_MAX_SIDE)
+            self.assertNotIn('exif', image.info)
+
+    def test_identical_images_are_stored_once(self):
+        """
+        Одинаковые картинки хранятся в одном файле.
+        """
+        for text in ('Первый пост', 'Второй пост'):
+            self.author_client.post(
+                reverse('posts:post_create'),
+                data={
+                    'text': text,
+                    'image': self.get_jpeg('same.jpg', (100, 100)),
+                },
+            )
+        first = Post.objects.get(text='Первый пост')
+        second = Post.objects.get(text='Второй пост')
+        self.assertEqual(first.image_hash, second.image_hash)
+        self.assertEqual(first.image.name, second.image.name)
+
+    def test_reused_image_is_touched(self):
+        """
+        Повторная загрузка картинки обновляет время изменения файла, и
+        release_image его не удаляет.
+        """
+        self.author_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Первый пост',
+                'image': self.get_jpeg('same.jpg', (100, 100)),
+            },
+        )
+        path = Post.objects.get(text='Первый пост').image.path
+        old = time.time() - 2 * 60 * 60
+        os.utime(path, (old, old))
+        self.author_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Второй пост',
+                'image': self.get_jpeg('same.jpg', (100, 100)),
+            },
+        )
+        self.assertGreater(os.path.getmtime(path), old + 60 * 60)
+
+    def test_too_large_file_is_rejected(self):
+        """
+        Файл больше допустимого размера не принимается формой.
+        """
+        form = PostForm(
+            data={'text': 'Текст'},
+            files={'image': self.get_jpeg('big.jpg', (100, 100))},
+        )
+        with patch('posts.images.IMAGE_MAX_UPLOAD_SIZE', 10):
+            self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
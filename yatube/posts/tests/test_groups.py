@@ -0,0 +1,138 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..groups import get_group_or_404, group_stats
+from ..models import Group, GroupStats, Post
+from ..views import POSTS_COUNT_PER_PAGE
+
+User = get_user_model()
+
+
+class GroupFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='HasNoName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_slug',
+            description='Другое описание группы',
+        )
+        cls.url = reverse('posts:group_posts', kwargs={'slug': 'test_slug'})
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def create_posts(self, count, group=None):
+        return [
+            Post.objects.create(
+                author=self.author, group=group or self.group, text='Пост'
+            )
+            for _ in range(count)
+        ]
+
+    def test_empty_group_is_shown(self):
+        """Пустая группа открывается, а не отдаёт 404."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats'].posts_count, 0)
+
+    def test_group_is_cached_and_invalidated(self):
+        """Группа берётся из кеша и сбрасывается при изменении."""
+        get_group_or_404('test_slug')
+        with self.assertNumQueries(0):
+            get_group_or_404('test_slug')
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertEqual(
+            get_group_or_404('test_slug').title, 'Новое название'
+        )
+
+    def test_stats_follow_posts(self):
+        """Статистика меняется при создании, переносе и удалении поста."""
+        first, second = self.create_posts(2)
+        stats = group_stats(self.group)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.posters_count, 1)
+        self.assertEqual(stats.last_post_at, second.pub_date)
+        second.group = self.other_group
+        second.save()
+        stats.refresh_from_db()
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.last_post_at, first.pub_date)
+        self.assertEqual(group_stats(self.other_group).posts_count, 1)
+        first.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.posts_count, 0)
+        self.assertEqual(stats.posters_count, 0)
+        self.assertIsNone(stats.last_post_at)
+
+    def test_posters_count(self):
+        """Автор считается один раз, сколько бы постов он ни написал."""
+        other = User.objects.create_user(username='other')
+        self.create_posts(2)
+        post = Post.objects.create(author=other, group=self.group, text='Пост')
+        self.assertEqual(group_stats(self.group).posters_count, 2)
+        post.delete()
+        self.assertEqual(group_stats(self.group).posters_count, 1)
+
+    def test_group_index(self):
+        """Каталог групп показывает статистику без агрегатов по постам."""
+        self.create_posts(3)
+        GroupStats.objects.filter(group=self.other_group).delete()
+        response = self.client.get(reverse('posts:group_index'))
+        group_list = list(response.context['page_obj'])
+        self.assertEqual(group_list, [self.other_group, self.group])
+        self.assertEqual(group_list[0].stats.posts_count, 0)
+        self.assertEqual(group_list[1].stats.posts_count, 3)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('posts:group_index'))
+
+    def test_admin_columns(self):
+        """Список групп в админке показывает статистику."""
+        self.create_posts(3)
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:posts_group_changelist'))
+        self.assertContains(response, 'Записей')
+        self.assertContains(response, '<td class="field-posts_count">3</td>')
+
+    def test_cursor_pages(self):
+        """Лента группы листается курсором."""
+        posts = self.create_posts(POSTS_COUNT_PER_PAGE + 3)
+        response = self.client.get(self.url, {'cursor': ''})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), POSTS_COUNT_PER_PAGE)
+        response = self.client.get(self.url, {'cursor': page_obj.next_cursor})
+        self.assertEqual(
+            list(response.context['page_obj']), posts[2::-1]
+        )
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_invalid_cursor(self):
+        """Некорректный курсор даёт 404."""
+        response = self.client.get(self.url, {'cursor': 'broken'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_refresh_command(self):
+        """Команда пересчитывает статистику после bulk_create."""
+        Post.objects.bulk_create(
+            Post(author=self.author, group=self.group, text='Пост')
+            for _ in range(3)
+        )
+        call_command('refresh_group_stats', stdout=StringIO())
+        self.assertEqual(
+            GroupStats.objects.get(group=self.group).posts_count, 3
+        )
@@ -0,0 +1,194 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from ..images import release_image
+from ..management.commands import collect_orphaned_media
+from ..models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+User = get_user_model()
+
+
+def create_post(author, text):
+    return Post.objects.create(
+        author=author,
+        text=text,
+        image=SimpleUploadedFile(
+            name='small.gif', content=SMALL_GIF, content_type='image/gif'
+        ),
+    )
+
+
+def make_old(path):
+    old = time.time() - 2 * 60 * 60
+    os.utime(path, (old, old))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostMediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, text):
+        return create_post(self.author, text)
+
+    def test_shared_image_is_released_with_last_post(self):
+        """
+        Общая картинка удаляется только вместе с последним постом.
+        """
+        first = self.create_post('Первый пост')
+        second = self.create_post('Второй пост')
+        self.assertEqual(first.image.name, second.image.name)
+        path = first.image.path
+        make_old(path)
+        first.delete()
+        self.assertFalse(release_image(second.image.name))
+        self.assertTrue(os.path.exists(path))
+        second.delete()
+        self.assertTrue(release_image(second.image.name))
+        self.assertFalse(os.path.exists(path))
+
+    def test_recently_reused_image_is_kept(self):
+        """
+        Файл, который только что переиспользовали, не удаляется, даже
+        если пост с ним ещё не сохранён.
+        """
+        post = self.create_post('Пост')
+        path = post.image.path
+        make_old(path)
+        post.delete()
+        storage = Post._meta.get_field('image').storage
+        storage.save('posts/small.gif', SimpleUploadedFile(
+            name='small.gif', content=SMALL_GIF, content_type='image/gif'
+        ))
+        self.assertFalse(release_image(post.image.name))
+        self.assertTrue(os.path.exists(path))
+        self.assertTrue(release_image(post.image.name, grace=0))
+        self.assertFalse(os.path.exists(path))
+
+    def test_rehash_media_moves_flat_files(self):
+        """
+        Команда rehash_media переносит старые файлы в хешированные пути.
+        """
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        old_name = 'posts/legacy.gif'
+        with open(os.path.join(TEMP_MEDIA_ROOT, old_name), 'wb') as file_:
+            file_.write(SMALL_GIF)
+        post = Post.objects.create(
+            author=self.author, text='Старый пост', image=old_name
+        )
+        call_command('rehash_media', stdout=StringIO(), stderr=StringIO())
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertEqual(len(post.image_hash), 64)
+        self.assertTrue(os.path.exists(post.image.path))
+        self.assertFalse(
+            os.path.exists(os.path.join(TEMP_MEDIA_ROOT, old_name))
+        )
+
+    def test_collect_orphaned_media(self):
+        """
+        Команда collect_orphaned_media удаляет только старые файлы,
+        на которые не ссылается ни один пост.
+        """
+        post = self.create_post('Пост с картинкой')
+        directory = os.path.join(TEMP_MEDIA_ROOT, 'posts')
+        orphan = os.path.join(directory, 'orphan.gif')
+        fresh = os.path.join(directory, 'fresh.gif')
+        for path in (orphan, fresh):
+            with open(path, 'wb') as file_:
+                file_.write(SMALL_GIF)
+        for path in (orphan, post.image.path):
+            make_old(path)
+
+        out = StringIO()
+        call_command(
+            'collect_orphaned_media', '--grace=3600', '--dry-run', stdout=out
+        )
+        self.assertIn('posts/orphan.gif', out.getvalue())
+        self.assertTrue(os.path.exists(orphan))
+
+        call_command(
+            'collect_orphaned_media', '--grace=3600', stdout=StringIO()
+        )
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(fresh))
+        self.assertTrue(os.path.exists(post.image.path))
+
+    def test_collect_rechecks_files_under_lock(self):
+        """
+        Файл, который переиспользовали или на который сослались после
+        обхода каталога, команда не удаляет.
+        """
+        touched = self.create_post('Пост')
+        make_old(touched.image.path)
+        name = touched.image.name
+        Post.objects.filter(pk=touched.pk).delete()
+        # Обход каталога нашёл старый файл, а потом его загрузили снова.
+        create_post(self.author, 'Новый пост').delete()
+        command = collect_orphaned_media.Command(stdout=StringIO())
+        command.storage = touched.image.storage
+        command.dry_run = False
+        command.verbosity = 1
+        command.files = command.reclaimed = 0
+        command.deadline = time.time() - 3600
+        command.collect_originals([(name, 1)])
+        self.assertTrue(os.path.exists(touched.image.path))
+        self.assertEqual(command.files, 0)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ReleaseOnCommitTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_image_is_released_after_commit(self):
+        """
+        Картинка удалённого поста удаляется после коммита транзакции,
+        а при откате остаётся на месте.
+        """
+        author = User.objects.create_user(username='author')
+        post = create_post(author, 'Пост')
+        path = post.image.path
+        make_old(path)
+        try:
+            with transaction.atomic():
+                Post.objects.get(pk=post.pk).delete()
+                self.assertTrue(os.path.exists(path))
+                raise DatabaseError
+        except DatabaseError:
+            pass
+        self.assertTrue(os.path.exists(path))
+        with transaction.atomic():
+            post.delete()
+            self.assertTrue(os.path.exists(path))
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,155 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.admin import ACTION_CHECKBOX_NAME
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import follows, moderation
+from ..groups import group_stats
+from ..models import Comment, Follow, Group, ModerationJob, Post
+
+User = get_user_model()
+
+
+@override_settings(TASKS_EAGER=True)
+class ModerationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.spammer = User.objects.create_user(username='spammer')
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        cls.target = Group.objects.create(
+            title='Другая группа',
+            slug='other_slug',
+            description='Другое описание группы',
+        )
+        cls.spam = [
+            Post.objects.create(author=cls.spammer, group=cls.group, text='')
+            for _ in range(3)
+        ]
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Пост'
+        )
+        Comment.objects.create(post=cls.post, author=cls.spammer, text='')
+        Follow.objects.create(user=cls.spammer, author=cls.user)
+        Follow.objects.create(user=cls.user, author=cls.spammer)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def run_action(self, model, action, objects, **data):
+        url = reverse(f'admin:posts_{model}_changelist')
+        return self.client.post(url, {
+            'action': action,
+            ACTION_CHECKBOX_NAME: [obj.pk for obj in objects],
+            **data,
+        }, follow=True)
+
+    def test_delete_authors_posts(self):
+        """Удаляются все посты авторов выбранных постов."""
+        self.run_action('post', 'delete_authors_posts', self.spam[:1])
+        self.assertEqual(list(Post.objects.all()), [self.post])
+        job = ModerationJob.objects.get()
+        self.assertEqual(job.status, ModerationJob.DONE)
+        self.assertEqual((job.processed, job.total), (3, 3))
+        self.assertEqual(group_stats(self.group).posts_count, 1)
+
+    def test_move_to_group(self):
+        """
+        Посты переносятся порциями, статистика групп и число постов в
+        лентах групп пересчитываются.
+        """
+        url = reverse('posts:group_posts', kwargs={'slug': 'other_slug'})
+        response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 0)
+        with mock.patch.object(moderation, 'CHUNK_SIZE', 2):
+            self.run_action(
+                'post', 'move_to_group', self.spam, group=self.target.pk
+            )
+        self.assertEqual(self.target.posts.count(), 3)
+        self.assertEqual(group_stats(self.target).posts_count, 3)
+        self.assertEqual(group_stats(self.group).posts_count, 1)
+        response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 3)
+
+    def test_move_requires_group(self):
+        """Без выбранной группы задача не создаётся."""
+        self.run_action('post', 'move_to_group', self.spam)
+        self.assertFalse(ModerationJob.objects.exists())
+
+    def test_purge_users(self):
+        """Удаляются комментарии и подписки спамера, кеш сбрасывается."""
+        self.assertTrue(follows.is_following(self.user, self.spammer))
+        comment = Comment.objects.get()
+        self.run_action('comment', 'purge_authors', [comment])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(follows.is_following(self.user, self.spammer))
+        self.assertEqual(ModerationJob.objects.get().processed, 3)
+
+    def test_stale_running_job_is_resumed(self):
+        """
+        Зависшая в работе задача продолжается с сохранённого прогресса,
+        а задачу, которая ещё обновляется, команда не трогает.
+        """
+        with self.settings(TASKS_EAGER=False):
+            job = moderation.start_job(
+                ModerationJob.DELETE_POSTS, author_ids=[self.spammer.pk]
+            )
+        # Исполнитель успел удалить одну порцию и остановился.
+        self.spam[0].delete()
+        ModerationJob.objects.filter(pk=job.pk).update(
+            status=ModerationJob.RUNNING,
+            processed=1,
+            total=3,
+            updated=timezone.now(),
+        )
+        with self.assertRaises(moderation.JobBusy):
+            moderation.run_job(job.pk)
+        out = StringIO()
+        call_command('run_moderation_jobs', stdout=out)
+        self.assertIn('Выполнено задач: 0', out.getvalue())
+        ModerationJob.objects.filter(pk=job.pk).update(
+            updated=timezone.now() - timedelta(hours=1)
+        )
+        call_command('run_moderation_jobs', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ModerationJob.DONE)
+        self.assertEqual((job.processed, job.total), (3, 3))
+        self.assertEqual(list(Post.objects.all()), [self.post])
+
+    def test_job_admin_and_pending_command(self):
+        """Задачи видны в админке, отложенные выполняет команда."""
+        with self.settings(TASKS_EAGER=False):
+            job = moderation.start_job(
+                ModerationJob.PURGE_USERS, user_ids=[self.spammer.pk]
+            )
+        self.assertEqual(job.status, ModerationJob.PENDING)
+        call_command('run_moderation_jobs', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ModerationJob.DONE)
+        response = self.client.get(
+            reverse('admin:posts_moderationjob_changelist')
+        )
+        self.assertContains(response, '3 из 3')
+        for model in ('comment', 'follow'):
+            with self.subTest(model=model):
+                response = self.client.get(
+                    reverse(f'admin:posts_{model}_changelist')
+                )
+                self.assertEqual(response.status_code, 200)
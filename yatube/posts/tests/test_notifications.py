@@ -0,0 +1,133 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Notification, Post
+from ..notifications import fan_out, unread_count
+
+User = get_user_model()
+
+
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [
+            User.objects.create_user(username=f'reader{i}') for i in range(3)
+        ]
+        cls.post = Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def comment(self, user, count=1):
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=user, text='Комментарий')
+            for _ in range(count)
+        )
+
+    def test_comments_are_coalesced(self):
+        """Комментарии к посту сводятся в одно уведомление автору."""
+        self.comment(self.readers[0], 2)
+        self.comment(self.readers[1])
+        self.comment(self.author)
+        self.assertEqual(fan_out(batch_size=2), 4)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recipient, self.author)
+        self.assertEqual(notification.kind, Notification.COMMENT)
+        self.assertEqual(notification.actors_count, 2)
+        self.assertEqual(notification.last_actor, self.readers[1])
+        self.comment(self.readers[0])
+        self.comment(self.readers[2])
+        fan_out()
+        notification.refresh_from_db()
+        self.assertEqual(notification.actors_count, 3)
+        self.assertEqual(notification.others_count, 2)
+        self.assertEqual(notification.last_actor, self.readers[2])
+        self.assertEqual(fan_out(), 0)
+
+    def test_read_notification_is_not_extended(self):
+        """Новые события не дописываются в прочитанное уведомление."""
+        self.comment(self.readers[0])
+        fan_out()
+        Notification.objects.update(is_read=True)
+        self.comment(self.readers[1])
+        fan_out()
+        self.assertEqual(
+            list(Notification.objects.values_list('is_read', 'actors_count')),
+            [(False, 1), (True, 1)],
+        )
+
+    def test_follows_are_coalesced(self):
+        """Подписки на автора сводятся в одно уведомление."""
+        for reader in self.readers:
+            Follow.objects.create(user=reader, author=self.author)
+        fan_out()
+        notification = Notification.objects.get()
+        self.assertEqual(notification.kind, Notification.FOLLOW)
+        self.assertIsNone(notification.post)
+        self.assertEqual(notification.actors_count, 3)
+
+    def test_fan_out_queries_do_not_depend_on_event_count(self):
+        """Число запросов порции не растёт с числом комментариев."""
+        self.comment(self.readers[0])
+        Follow.objects.create(user=self.readers[0], author=self.author)
+        fan_out()
+        queries = []
+        for count in (2, 40):
+            for reader in self.readers:
+                self.comment(reader, count)
+            with CaptureQueriesContext(connection) as context:
+                fan_out()
+            queries.append(len(context))
+        self.assertEqual(queries[0], queries[1])
+
+    def test_unread_count_is_cached(self):
+        """Число непрочитанных берётся из кеша и сбрасывается рассылкой."""
+        self.comment(self.readers[0])
+        self.assertEqual(unread_count(self.author), 0)
+        fan_out()
+        with self.assertNumQueries(1):
+            self.assertEqual(unread_count(self.author), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(self.author), 1)
+
+    def test_inbox_marks_notifications_read(self):
+        """Открытая страница уведомлений отмечает их прочитанными."""
+        self.comment(self.readers[0])
+        call_command('fan_out_notifications', stdout=StringIO())
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['unread_notifications'], 1)
+        response = self.client.get(reverse('posts:notification_list'))
+        self.assertContains(response, 'reader0')
+        self.assertFalse(response.context['page_obj'][0].is_read)
+        self.assertFalse(
+            Notification.objects.filter(is_read=False).exists()
+        )
+        self.assertEqual(unread_count(self.author), 0)
+
+    def test_inbox_requires_login(self):
+        """Уведомления доступны только авторизованным."""
+        response = Client().get(reverse('posts:notification_list'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_only_shown_page_is_marked_read(self):
+        """Уведомления на непросмотренных страницах остаются новыми."""
+        for _ in range(12):
+            post = Post.objects.create(author=self.author, text='Пост')
+            Comment.objects.create(
+                post=post, author=self.readers[0], text='Комментарий'
+            )
+        fan_out()
+        self.client.get(reverse('posts:notification_list'))
+        self.assertEqual(unread_count(self.author), 2)
+        self.client.get(reverse('posts:notification_list') + '?page=2')
+        self.assertEqual(unread_count(self.author), 0)
@@ -0,0 +1,63 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, Recommendation
+
+User = get_user_model()
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.friend = User.objects.create_user(username='friend')
+        cls.friend_of_friend = User.objects.create_user(username='fof')
+        cls.group_mate = User.objects.create_user(username='group_mate')
+        cls.commented = User.objects.create_user(username='commented')
+        Follow.objects.create(user=cls.user, author=cls.friend)
+        Follow.objects.create(user=cls.friend, author=cls.friend_of_friend)
+        group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        Post.objects.create(author=cls.user, group=group, text='Пост')
+        Post.objects.create(author=cls.group_mate, group=group, text='Пост')
+        post = Post.objects.create(author=cls.commented, text='Пост')
+        post.comments.create(author=cls.user, text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+
+    def test_recommendations_are_computed(self):
+        """
+        Команда рекомендует друзей друзей, соседей по группе и
+        авторов, которых пользователь комментировал.
+        """
+        call_command('compute_recommendations', stdout=StringIO())
+        candidates = list(
+            Recommendation.objects.filter(user=self.user)
+            .values_list('candidate__username', flat=True)
+        )
+        self.assertEqual(candidates, ['commented', 'fof', 'group_mate'])
+
+    def test_follow_page_shows_suggestions(self):
+        """
+        Страница подписок показывает рекомендации без уже
+        подписанных авторов.
+        """
+        call_command('compute_recommendations', stdout=StringIO())
+        Follow.objects.create(user=self.user, author=self.commented)
+        cache.clear()
+        response = self.user_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [user.username for user in response.context['suggestions']],
+            ['fof', 'group_mate'],
+        )
@@ -0,0 +1,144 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import trending
+from ..models import Comment, Follow, Post, TrendingPost
+from ..trending import WINDOW, default_score, update_trending
+
+User = get_user_model()
+
+
+def constant_score(comments_count, follower_count, pub_date):
+    return 1.0
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='HasNoName')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.quiet = Post.objects.create(author=cls.author, text='Тихий')
+        cls.popular = Post.objects.create(
+            author=cls.author, text='Обсуждаемый'
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def comment(self, post, count=1):
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.reader, text='Комментарий')
+            for _ in range(count)
+        )
+
+    def test_score_decays_with_time(self):
+        """Более свежий пост с той же вовлечённостью выше."""
+        now = timezone.now()
+        self.assertGreater(
+            default_score(5, 10, now),
+            default_score(5, 10, now - timedelta(days=1)),
+        )
+        self.assertGreater(default_score(5, 0, now), default_score(0, 0, now))
+
+    def test_posts_ranked_by_comments(self):
+        """Пост с комментариями выше в ленте популярного."""
+        self.comment(self.popular, 3)
+        self.assertEqual(update_trending(), 2)
+        response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(
+            list(response.context['page_obj']), [self.popular, self.quiet]
+        )
+        self.assertEqual(
+            TrendingPost.objects.get(post=self.popular).comments_count, 3
+        )
+
+    def test_update_is_incremental(self):
+        """Повторный пересчёт трогает только посты с новыми комментариями."""
+        update_trending()
+        self.assertEqual(update_trending(), 0)
+        popular = TrendingPost.objects.get(post=self.popular)
+        self.comment(self.quiet, 2)
+        with mock.patch(
+            'posts.trending.score_posts', wraps=trending.score_posts
+        ) as score_posts:
+            self.assertEqual(update_trending(), 1)
+        self.assertEqual(
+            [list(args[0]) for args, _ in score_posts.call_args_list],
+            [[self.quiet.pk]],
+        )
+        self.assertEqual(
+            TrendingPost.objects.get(post=self.quiet).comments_count, 2
+        )
+        unchanged = TrendingPost.objects.get(post=self.popular)
+        self.assertEqual(
+            (unchanged.score, unchanged.comments_count),
+            (popular.score, popular.comments_count),
+        )
+
+    def test_late_committed_comment_is_counted(self):
+        """
+        Комментарий, закоммиченный позже комментария с большим id, тоже
+        учитывается.
+        """
+        Comment.objects.create(
+            pk=1000, post=self.popular, author=self.reader, text='Позже'
+        )
+        update_trending()
+        Comment.objects.create(
+            pk=999, post=self.quiet, author=self.reader, text='Раньше'
+        )
+        self.assertEqual(update_trending(), 1)
+        self.assertEqual(
+            TrendingPost.objects.get(post=self.quiet).comments_count, 1
+        )
+        self.assertEqual(update_trending(), 0)
+
+    def test_full_update_picks_up_followers(self):
+        """Полный пересчёт учитывает новых подписчиков автора."""
+        update_trending()
+        before = TrendingPost.objects.get(post=self.quiet).score
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(update_trending(full=True), 2)
+        self.assertGreater(
+            TrendingPost.objects.get(post=self.quiet).score, before
+        )
+
+    def test_old_posts_are_pruned(self):
+        """Посты старше окна удаляются из таблицы."""
+        update_trending()
+        Post.objects.filter(pk=self.quiet.pk).update(
+            pub_date=timezone.now() - WINDOW - timedelta(hours=1)
+        )
+        update_trending()
+        trending = TrendingPost.objects.values_list('post', flat=True)
+        self.assertEqual(list(trending), [self.popular.pk])
+
+    @override_settings(
+        TRENDING_SCORE_FUNCTION='posts.tests.test_trending.constant_score'
+    )
+    def test_score_function_is_pluggable(self):
+        """Функция оценки задаётся настройкой."""
+        update_trending()
+        self.assertEqual(
+            set(TrendingPost.objects.values_list('score', flat=True)), {1.0}
+        )
+
+    def test_commands(self):
+        """Команды пересчёта и замера выводят отчёт."""
+        out = StringIO()
+        call_command('update_trending', stdout=out)
+        self.assertIn('Пересчитано постов: 2', out.getvalue())
+        out = StringIO()
+        call_command(
+            'benchmark_trending', users=3, posts=20, comments=100,
+            increment=10, stdout=out,
+        )
+        self.assertIn('Инкрементальный пересчёт', out.getvalue())
+        self.assertEqual(Comment.objects.count(), 0)
@@ -9,6 +9,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from .. import feeds
 from ..models import Follow, Group, Post
 from ..views import POSTS_COUNT_PER_PAGE
 
@@ -362,6 +363,9 @@ class PaginatorViewsTest(TestCase):
         Post.objects.bulk_create(posts)
 
     def setUp(self):
+        # Посты созданы через bulk_create, который не сбрасывает
+        # закешированное число постов в лентах.
+        cache.clear()
         self.user = User.objects.create_user(username='HasNoName')
         self.user_client = Client()
         self.user_client.force_login(self.user)
@@ -397,3 +401,102 @@ class PaginatorViewsTest(TestCase):
                     len(response_second_page.context['page_obj']),
                     self.POSTS_COUNT % POSTS_COUNT_PER_PAGE,
                 )
+
+
+class FeedCountCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        Post.objects.create(author=cls.author, group=cls.group, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse(
+                'posts:profile', kwargs={'username': self.author.username}
+            ),
+        )
+
+    def counts(self):
+        return [
+            self.client.get(url).context['page_obj'].paginator.count
+            for url in self.urls
+        ]
+
+    def test_counts_follow_create_and_delete(self):
+        """Закешированное число постов сбрасывается при создании и удалении."""
+        self.assertEqual(self.counts(), [1, 1, 1])
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Новый пост'
+        )
+        self.assertEqual(self.counts(), [2, 2, 2])
+        post.delete()
+        self.assertEqual(self.counts(), [1, 1, 1])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_GENERATE_ASYNC=False)
+class FeedPrefetchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        # Самый старый пост с картинкой попадает на вторую страницу.
+        Post.objects.create(
+            author=cls.author,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='small.gif', content=small_gif, content_type='image/gif'
+            ),
+        )
+        for number in range(POSTS_COUNT_PER_PAGE):
+            Post.objects.create(author=cls.author, text=f'Пост {number}')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_link_to_next_page(self):
+        """Лента ссылается на следующую страницу в заголовке Link."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response['Link'], '</?page=2>; rel="next"')
+        response = self.client.get(reverse('posts:index'), {'page': 2})
+        self.assertFalse(response.has_header('Link'))
+
+    def test_warmed_page_thumbnails_are_prefetched(self):
+        """После прогрева в Link попадают миниатюры следующей страницы."""
+        response = self.client.get(reverse('posts:index'))
+        page_obj = response.context['page_obj']
+        feeds.warm_page(
+            feeds.INDEX_FEED,
+            page_obj.paginator.page(2),
+            ('index_page', 'posts/index.html'),
+        )
+        thumbnails = feeds.next_page_thumbnails(feeds.INDEX_FEED, 2)
+        self.assertEqual(len(thumbnails), 1)
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn(
+            f'<{thumbnails[0]}>; rel="prefetch"; as="image"', response['Link']
+        )
+        with self.assertNumQueries(0):
+            # Фрагмент второй страницы и число постов уже в кеше.
+            response = self.client.get(reverse('posts:index'), {'page': 2})
+        self.assertContains(response, thumbnails[0])
@@ -0,0 +1,88 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..management.commands import warm_cache
+from ..management.commands.warm_cache import Throttle
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class WarmCacheCommandTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        Post.objects.create(author=cls.author, group=cls.group, text='Пост')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_popular_pages_are_rendered(self):
+        """
+        С --local команда рендерит главную, группы и профили в своём
+        процессе и пишет отчёт.
+        """
+        out = StringIO()
+        call_command(
+            'warm_cache',
+            index_pages=2,
+            workers=1,
+            local=True,
+            verbosity=2,
+            stdout=out,
+        )
+        report = out.getvalue()
+        for path in ('/', '/?page=2', '/group/test_slug/', '/profile/author/'):
+            with self.subTest(path=path):
+                self.assertIn(f' {path}\n', report)
+        self.assertNotIn('/profile/reader/', report)
+        self.assertIn('Прогрето страниц: 4, ошибок: 0', report)
+        self.assertIsNotNone(
+            cache.get(make_template_fragment_key('index_page', [1]))
+        )
+
+    @override_settings(WARM_CACHE_BASE_URL='http://server:8000')
+    def test_pages_are_requested_from_server_by_default(self):
+        """По умолчанию страницы запрашиваются у сервера по HTTP."""
+        response = mock.MagicMock(status=200)
+        response.__enter__.return_value = response
+        with mock.patch.object(
+            warm_cache, 'urlopen', return_value=response
+        ) as urlopen:
+            out = StringIO()
+            call_command('warm_cache', index_pages=1, workers=1, stdout=out)
+        self.assertEqual(
+            sorted(args[0] for args, _ in urlopen.call_args_list),
+            [
+                'http://server:8000/',
+                'http://server:8000/group/test_slug/',
+                'http://server:8000/profile/author/',
+            ],
+        )
+        self.assertIsNone(
+            cache.get(make_template_fragment_key('index_page', [1]))
+        )
+        self.assertIn('Прогрето страниц: 3, ошибок: 0', out.getvalue())
+
+    def test_throttle_spaces_requests(self):
+        """Ограничение частоты растягивает запросы во времени."""
+        throttle = Throttle(rate=0)
+        self.assertEqual(throttle.interval, 0)
+        throttle = Throttle(rate=4)
+        first = throttle.next_slot
+        for _ in range(3):
+            throttle.wait()
+        self.assertAlmostEqual(throttle.next_slot - first, 0.75, places=2)
@@ -0,0 +1,158 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Comment, Follow, Post, TrendingPost
+
+COMMENT_WEIGHT = 1.0
+FOLLOWER_WEIGHT = 0.1
+
+# За это время оценка поста падает так же, как от уменьшения
+# вовлечённости в e раз.
+DECAY_SECONDS = 12 * 60 * 60
+
+WINDOW = timedelta(days=7)
+BATCH_SIZE = 500
+# Комментарии коммитятся не строго по порядку id: комментарий может
+# появиться в базе позже комментария с большим id. Поэтому посты
+# с комментариями из стольких id ниже последнего учтённого тоже
+# проверяются, по числу комментариев.
+COMMENT_LAG = 1000
+
+
+def default_score(comments_count, follower_count, pub_date):
+    """
+    Логарифм вовлечённости плюс время публикации. Затухание заложено
+    в саму оценку: со временем новые посты получают больше, поэтому
+    оценки старых не нужно пересчитывать, пока у них нет новых
+    комментариев.
+    """
+    engagement = (
+        COMMENT_WEIGHT * comments_count + FOLLOWER_WEIGHT * follower_count
+    )
+    return math.log1p(engagement) + pub_date.timestamp() / DECAY_SECONDS
+
+
+def get_score_function():
+    """Функция оценки из настройки TRENDING_SCORE_FUNCTION."""
+    path = getattr(settings, 'TRENDING_SCORE_FUNCTION', None)
+    if path is None:
+        return default_score
+    return import_string(path)
+
+
+def _batches(ids, size):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def stale_post_ids(since, full=False):
+    """
+    id постов окна, оценку которых нужно пересчитать: новые посты и
+    посты с недавними комментариями (новее последнего учтённого без
+    COMMENT_LAG), у которых число комментариев разошлось с учтённым.
+    Посты и комментарии, созданные через bulk_create, сигналов не
+    посылают, поэтому изменения ищутся по таблицам, а не по сигналам.
+    """
+    posts = Post.objects.filter(pub_date__gte=since)
+    if full:
+        return sorted(posts.values_list('pk', flat=True).order_by())
+    watermark = (
+        TrendingPost.objects.aggregate(last=Max('last_comment_id'))['last']
+        or 0
+    )
+    new_posts = posts.filter(trending__isnull=True).values_list(
+        'pk', flat=True
+    ).order_by()
+    recent = list(
+        Comment.objects.filter(
+            pk__gt=watermark - COMMENT_LAG, post__pub_date__gte=since
+        )
+        .values_list('post_id', flat=True)
+        .distinct()
+        .order_by()
+    )
+    counts = dict(
+        Comment.objects.filter(post_id__in=recent)
+        .values('post_id')
+        .annotate(count=Count('pk'))
+        .values_list('post_id', 'count')
+        .order_by()
+    )
+    scored = dict(
+        TrendingPost.objects.filter(post_id__in=recent).values_list(
+            'post_id', 'comments_count'
+        )
+    )
+    commented = {
+        post_id for post_id, count in counts.items()
+        if scored.get(post_id) != count
+    }
+    return sorted(set(new_posts) | commented)
+
+
+def score_posts(post_ids, score=None):
+    """Новые строки TrendingPost для пачки постов, тремя запросами."""
+    score = score or get_score_function()
+    posts = list(
+        Post.objects.filter(pk__in=post_ids)
+        .values_list('pk', 'author_id', 'pub_date')
+        .order_by()
+    )
+    comments = {
+        row['post_id']: (row['count'], row['last'])
+        for row in Comment.objects.filter(post_id__in=post_ids)
+        .values('post_id')
+        .annotate(count=Count('pk'), last=Max('pk'))
+        .order_by()
+    }
+    followers = dict(
+        Follow.objects.filter(
+            author_id__in={author_id for _, author_id, _ in posts}
+        )
+        .values('author_id')
+        .annotate(count=Count('pk'))
+        .values_list('author_id', 'count')
+        .order_by()
+    )
+    rows = []
+    for pk, author_id, pub_date in posts:
+        count, last = comments.get(pk, (0, 0))
+        rows.append(TrendingPost(
+            post_id=pk,
+            score=score(count, followers.get(author_id, 0), pub_date),
+            comments_count=count,
+            last_comment_id=last,
+        ))
+    return rows
+
+
+def update_trending(full=False, batch_size=BATCH_SIZE, now=None):
+    """
+    Обновляет таблицу популярного: пересчитывает только изменившиеся
+    посты и удаляет вышедшие из окна. Число подписчиков автора
+    обновляется вместе с оценкой поста; full=True пересчитывает
+    все посты окна. Возвращает число пересчитанных постов.
+    """
+    since = (now or timezone.now()) - WINDOW
+    score = get_score_function()
+    post_ids = stale_post_ids(since, full=full)
+    for batch in _batches(post_ids, batch_size):
+        rows = score_posts(batch, score)
+        with transaction.atomic():
+            TrendingPost.objects.filter(post_id__in=batch).delete()
+            TrendingPost.objects.bulk_create(rows)
+    TrendingPost.objects.filter(post__pub_date__lt=since).delete()
+    return len(post_ids)
+
+
+def trending_posts():
+    """Посты по убыванию оценки: чтение по индексу готовой таблицы."""
+    return Post.objects.filter(trending__isnull=False).order_by(
+        '-trending__score', '-pk'
+    )
@@ -6,6 +6,8 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('trending/', views.trending, name='trending'),
+    path('group/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('create/', views.post_create, name='post_create'),
@@ -18,6 +20,11 @@ urlpatterns = [
         name='add_comment',
     ),
     path('follow/', views.follow_index, name='follow_index'),
+    path(
+        'notifications/',
+        views.notification_list,
+        name='notification_list',
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,36 +1,103 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.shortcuts import (
-    get_list_or_404, get_object_or_404, redirect, render
-)
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
 
+from core.pagination import CachedCountPaginator, CursorPage, InvalidCursor
+from core.prefetch import add_links, warm_up
+from core.ratelimit import rate_limit
+
+from . import comment_queue, feeds, follows, groups, notifications
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Group, Notification, Post, User
+from .recommendations import suggestions_for
+from .trending import trending_posts
 
 POSTS_COUNT_PER_PAGE = 10
+GROUPS_COUNT_PER_PAGE = 20
 
 
-def get_page_obj(request, posts):
-    paginator = Paginator(posts, POSTS_COUNT_PER_PAGE)
+def get_page_obj(request, posts, count_key=None,
+                 per_page=POSTS_COUNT_PER_PAGE):
+    paginator = CachedCountPaginator(posts, per_page, count_key=count_key)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
+def render_feed(request, template, context, feed, fragment=None):
+    """
+    Отдаёт страницу ленты с заголовком Link на следующую страницу и
+    её миниатюры и ставит следующую страницу на прогрев в фоне.
+    """
+    response = render(request, template, context)
+    page_obj = context['page_obj']
+    if not page_obj.has_next():
+        return response
+    number = page_obj.next_page_number()
+    links = [(f'{request.path}?page={number}', 'rel="next"')]
+    thumbnails = feeds.next_page_thumbnails(feed, number)
+    if thumbnails is None:
+        warm_up(
+            f'{feed}:{number}',
+            feeds.warm_page,
+            feed,
+            page_obj.paginator.page(number),
+            fragment,
+        )
+    else:
+        links.extend((url, 'rel="prefetch"; as="image"') for url in thumbnails)
+    return add_links(response, links)
+
+
 def index(request):
     posts = Post.objects.all()
     context = {
-        'page_obj': get_page_obj(request, posts),
+        'page_obj': get_page_obj(request, posts, feeds.INDEX_FEED),
     }
-    return render(request, 'posts/index.html', context)
+    return render_feed(
+        request,
+        'posts/index.html',
+        context,
+        feeds.INDEX_FEED,
+        fragment=('index_page', 'posts/index.html'),
+    )
+
+
+def trending(request):
+    context = {
+        'page_obj': get_page_obj(request, trending_posts()),
+        'trending': True,
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+def group_index(request):
+    group_list = Group.objects.select_related('stats').order_by('title')
+    page_obj = get_page_obj(
+        request, group_list, feeds.GROUP_INDEX, GROUPS_COUNT_PER_PAGE
+    )
+    page_obj.object_list = groups.attach_stats(list(page_obj.object_list))
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/group_index.html', context)
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = get_list_or_404(Post, group=group)
+    group = groups.get_group_or_404(slug)
+    posts = Post.objects.filter(group=group)
+    cursor = request.GET.get('cursor')
+    if cursor is None:
+        page_obj = get_page_obj(request, posts, feeds.group_feed(group.pk))
+    else:
+        try:
+            page_obj = CursorPage(posts, cursor, POSTS_COUNT_PER_PAGE)
+        except InvalidCursor:
+            raise Http404
     context = {
         'group': group,
-        'page_obj': get_page_obj(request, posts),
+        'stats': groups.group_stats(group),
+        'page_obj': page_obj,
     }
     return render(request, 'posts/group_list.html', context)
 
@@ -38,16 +105,13 @@ def group_posts(request, slug):
 def profile(request, username):
     author = get_object_or_404(User, username=username)
     posts = author.posts.all()
-    posts_count = posts.count()
-    following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(user=request.user, author=author)
-    )
-    follower_count = Follow.objects.filter(author=author).count()
+    page_obj = get_page_obj(request, posts, feeds.profile_feed(author.pk))
+    following = follows.is_following(request.user, author)
+    follower_count = follows.follower_count(author)
     context = {
-        'page_obj': get_page_obj(request, posts),
+        'page_obj': page_obj,
         'author': author,
-        'posts_count': posts_count,
+        'posts_count': page_obj.paginator.count,
         'following': following,
         'follower_count': follower_count,
     }
@@ -59,18 +123,28 @@ def post_detail(request, post_id):
     posts_count = post.author.posts.count()
     form = CommentForm()
     comments = post.comments.all()
-    follower_count = Follow.objects.filter(author=post.author).count()
+    pending_comments = []
+    if request.user.is_authenticated and request.session.get(
+        comment_queue.PENDING_KEY
+    ):
+        comments = list(comments)
+        pending_comments = comment_queue.pending_comments(
+            request, post, comments
+        )
+    follower_count = follows.follower_count(post.author)
     context = {
         'post': post,
         'posts_count': posts_count,
         'form': form,
         'comments': comments,
+        'pending_comments': pending_comments,
         'follower_count': follower_count,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
 @login_required
+@rate_limit('post_create')
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -116,9 +190,21 @@ def post_delete(request, post_id):
 
 
 @login_required
+@rate_limit('add_comment')
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
+    if comment_queue.is_enabled():
+        # Комментарий пишется в очередь и попадает в базу порцией в
+        # фоне, а автор до записи видит его из своей сессии.
+        if not Post.objects.filter(pk=post_id).exists():
+            raise Http404
+        if form.is_valid():
+            entry = comment_queue.enqueue(
+                post_id, request.user.pk, form.cleaned_data['text']
+            )
+            comment_queue.remember(request.session, entry)
+        return redirect('posts:post_detail', post_id=post_id)
+    post = get_object_or_404(Post, pk=post_id)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
@@ -129,28 +215,52 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = Post.objects.filter(
+        **follows.followed_posts_filter(request.user)
+    )
     context = {
         'page_obj': get_page_obj(request, posts),
         'follow': True,
+        'suggestions': suggestions_for(request.user),
     }
-    return render(request, 'posts/follow.html', context)
+    return render_feed(
+        request, 'posts/follow.html', context, feeds.follow_feed(request.user)
+    )
 
 
 @login_required
+def notification_list(request):
+    items = Notification.objects.filter(
+        recipient=request.user
+    ).select_related('last_actor', 'post')
+    page_obj = get_page_obj(request, items)
+    # Страница читается до отметки, чтобы новые уведомления выделялись.
+    page_obj.object_list = list(page_obj.object_list)
+    notifications.mark_read(request.user, page_obj.object_list)
+    return render(request, 'posts/notifications.html', {'page_obj': page_obj})
+
+
+def follow_response(request, author, following):
+    """JSON для клиентов, которые его просят, иначе редирект в профиль."""
+    if 'application/json' in request.META.get('HTTP_ACCEPT', ''):
+        return JsonResponse({
+            'following': following,
+            'follower_count': follows.follower_count(author),
+        })
+    return redirect('posts:profile', username=author.username)
+
+
+@login_required
+@rate_limit('profile_follow', methods=('GET', 'POST'))
 def profile_follow(request, username):
-    follow = get_object_or_404(User, username=username)
-    is_exist = Follow.objects.filter(user=request.user, author=follow).exists()
-    if follow != request.user and not is_exist:
-        Follow.objects.get_or_create(
-            user=request.user,
-            author=follow,
-        )
-    return redirect('posts:profile', username=username)
+    author = get_object_or_404(User, username=username)
+    follows.follow(request.user, author)
+    return follow_response(request, author, author != request.user)
 
 
 @login_required
+@rate_limit('profile_follow', methods=('GET', 'POST'))
 def profile_unfollow(request, username):
-    unfollow = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=unfollow).delete()
-    return redirect('posts:profile', username=username)
+    author = get_object_or_404(User, username=username)
+    follows.unfollow(request.user, author)
+    return follow_response(request, author, False)
@@ -19,6 +19,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -34,7 +35,7 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.auth.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -55,6 +56,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.notifications.unread_notifications',
             ],
         },
     },
@@ -98,11 +100,28 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+
+# Без DEBUG статика собирается collectstatic в файлы с хешем в имени
+# и сжатыми копиями; в разработке манифеста нет.
+if not DEBUG:
+    STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь фоновых задач, а доставляет их исполнитель
+# run_tasks через EMAIL_DELIVERY_BACKEND, порциями по одному соединению.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+EMAIL_BATCH_SIZE = 50
+
+# Соединение с почтой у исполнителя переиспользуется, пока простаивает
+# не дольше стольких секунд.
+EMAIL_CONNECTION_IDLE = 30
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
@@ -112,12 +131,116 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загружаемые файлы пишутся во временный файл на диске по частям,
+# а не собираются целиком в памяти.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # Файловый кеш общий для всех процессов сервера на машине: выход из
+    # аккаунта в одном процессе виден остальным. Каталог проверяется на
+    # переполнение не чаще раза в CULL_INTERVAL секунд. В тестах его
+    # заменяет кеш в памяти, см. core.testing.TestRunner.
+    'shared': {
+        'BACKEND': 'core.cache.SharedFileCache',
+        'LOCATION': os.path.join(BASE_DIR, 'shared_cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'CULL_INTERVAL': 60,
+        },
+    },
 }
 
+# Сессии читаются из кеша, а в базу запрос идёт только при промахе.
+# Запись идёт и в кеш, и в базу, поэтому вытеснение из кеша безопасно.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+SESSION_CACHE_ALIAS = 'shared'
+
+# Снимок request.user хранится в общем кеше, чтобы авторизованные
+# запросы не читали auth_user. Сбрасывается при сохранении пользователя.
+AUTH_USER_CACHE_ALIAS = 'shared'
+
+AUTH_USER_CACHE_TIMEOUT = 5 * 60
+
+# Подписки, число подписчиков и группы кешируются в общем кеше:
+# изменение в одном процессе сразу видно остальным.
+FOLLOW_CACHE_ALIAS = 'shared'
+
+GROUP_CACHE_ALIAS = 'shared'
+
+TEST_RUNNER = 'core.testing.TestRunner'
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+# Отсутствующие миниатюры ленты создаются в фоновых потоках.
+THUMBNAIL_GENERATE_ASYNC = True
+
+THUMBNAIL_WORKERS = 2
+
+# Функция оценки для ленты популярного, см. posts.trending.default_score.
+TRENDING_SCORE_FUNCTION = 'posts.trending.default_score'
+
+# Фоновые задачи core.tasks выполняет команда run_tasks. При
+# TASKS_EAGER = True они выполняются сразу при постановке, без очереди.
+TASKS_EAGER = False
+
+TASKS_WORKERS = 2
+
+# Пауза перед первым повтором задачи после ошибки, дальше она растёт вдвое.
+TASKS_RETRY_DELAY = 10
+
+# Исполнитель продлевает взятую задачу каждую треть этого срока; задачу,
+# которую не продлевали столько секунд, можно выдать повторно.
+TASKS_LOCK_TIMEOUT = 10 * 60
+
+# Сколько секунд число постов ленты для пагинатора может браться из кеша.
+PAGINATOR_COUNT_TIMEOUT = 60
+
+# Следующая страница ленты прогревается в фоне после отдачи текущей.
+WARMUP_ENABLED = True
+
+WARMUP_WORKERS = 1
+
+WARMUP_QUEUE_SIZE = 16
+
+# Комментарии пишутся в файловую очередь и сохраняются в базу порциями
+# в фоне, чтобы всплески комментариев не упирались в блокировки записи.
+COMMENTS_WRITE_BEHIND = False
+
+COMMENT_QUEUE_DIR = os.path.join(BASE_DIR, 'comment_queue')
+
+# Раз в столько секунд очередь сбрасывает поток в каждом процессе,
+# при 0 — только команда flush_comments.
+COMMENT_FLUSH_INTERVAL = 1
+
+# Сервер, страницы которого прогревает команда warm_cache: её запросы
+# должны попасть в процессы сервера, чтобы прогреть и их LocMemCache.
+WARM_CACHE_BASE_URL = 'http://localhost:8000'
+
+# Сколько секунд число непрочитанных уведомлений может браться из кеша.
+# Кеш общий: команда рассылки сбрасывает его для процессов сервера.
+NOTIFICATIONS_COUNT_TIMEOUT = 60
+
+NOTIFICATIONS_CACHE_ALIAS = 'shared'
+
+# Ограничения частоты запросов к изменяющим данные страницам по
+# областям декоратора core.ratelimit.rate_limit; область без политики
+# или с None не ограничивается. Подписка и отписка делят одну область,
+# пакетные методы API расходуют по жетону на элемент.
+RATE_LIMITS = {
+    'post_create': '10/m',
+    'add_comment': '30/m',
+    'profile_follow': '60/m',
+    'signup': '5/m',
+}
+
+# Счётчики ограничения частоты. Кеш должен быть общим для процессов
+# сервера и уметь атомарный incr: SharedFileCache это умеет.
+RATELIMIT_CACHE_ALIAS = 'shared'
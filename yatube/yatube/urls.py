@@ -1,7 +1,9 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core.views import serve_static
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
@@ -9,12 +11,21 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/', include('api.urls', namespace='api')),
 ]
 
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
 handler403 = 'core.views.permission_denied'
 
+if not settings.DEBUG:
+    urlpatterns += (
+        re_path(
+            r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'),
+            serve_static,
+        ),
+    )
+
 if settings.DEBUG:
     import debug_toolbar
     urlpatterns += static(